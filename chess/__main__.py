@@ -1,11 +1,26 @@
 import arcade
 from components.pieces import Piece, Pawn, Rook, Knight, Bishop, Queen, King # Import from pieces.py
+from components.pieces import load_textures # Piece images, decoded once
+from components.text_cache import TEXT_CACHE # Banners drawn from pre-built Text objects
+from components.profiler import PROFILER, TIMING # Frame and engine timings, debug events
 from moves.input_handler import InputHandler
 from board_renderer import BoardRenderer # Import BoardRenderer
+from move_history_panel import MoveHistoryPanel
+from profiler_overlay import ProfilerOverlay
 from game_ui import GameUI # Import GameUI
 import components.constants as c # Import constants
-from moves import move_logic # For algebraic notation after promotion
+from moves import san # Notation of the promotion piece
 from moves.ai_player import AIPlayer # Import the AIPlayer
+from moves import ai_worker # Worker process the AI thinks in
+from moves.position import Position # Square-indexed container for the live pieces
+from moves.fen import parse_fen, to_fen, START_FEN
+from moves import pgn # Saving the game
+import datetime
+import os
+from moves.attack_cache import ATTACK_CACHE # Check queries memoized per position
+from moves.tablebase import Tablebases # Endgame tables, shared by the AI and the game-over checks
+
+PIECE_CLASSES = {"pawn": Pawn, "rook": Rook, "knight": Knight, "bishop": Bishop, "queen": Queen, "king": King}
 
 class MyGame(arcade.Window):
     def __init__(self):
@@ -27,7 +42,7 @@ class MyGame(arcade.Window):
 
         self.game_state = c.SETUP # Start in the setup state
         
-        self.all_piece_objects: list[Piece] = [] # To store Piece objects for logic
+        self.all_piece_objects: Position = Position(board_size=self.BOARD_SIZE) # Piece objects for logic, indexed by square
         self.piece_sprites = arcade.SpriteList() # SpriteList for drawing pieces
         self.c = c # Make constants accessible via self.c
 
@@ -38,57 +53,123 @@ class MyGame(arcade.Window):
         self.promoting_pawn: Piece | None = None # Stores the pawn being promoted
         self.game_over_message: str | None = None # To store "Checkmate" or "Stalemate" message
         self.move_history: list[str] = [] # To store algebraic notation of moves
+        self.start_fen = START_FEN # Position the move history starts from
         self.show_check_message_timer: float = 0.0 # Timer for "CHECK!" display
         self.ai_player: AIPlayer | None = None
         self.ai_color: str | None = None
+        self.move_counter = 0 # Changes to the board so far; cached legal moves are tied to it
+        self.tablebases = Tablebases()
+        self.endgame_message: str | None = None # Tablebase verdict, e.g. "white mates in 7"
+        self.needs_redraw = True # Set when the scene changes; with c.ON_DEMAND_REDRAW frames are only drawn then
 
+        load_textures() # The 12 piece images, shared by all the sprites
         self._setup_pieces()
 
         self.input_handler = InputHandler(self)
         self.board_renderer = BoardRenderer(self.SQUARE_SIZE, self.BOARD_SIZE, self.MARGIN)
         self.game_ui = GameUI(window_width, window_height)
 
-    def _setup_pieces(self):
-        """Initializes and places all pieces on the board."""
-        # Clear existing pieces and sprites before setting up new ones
+        # Move history on the right side, from the top down
+        line_height = 18
+        self.history_panel = MoveHistoryPanel(
+            self.board_pixel_width + 2 * self.MARGIN + 10, # Start X for history text
+            self.height - self.MARGIN - 30, # Start Y from top
+            (self.height - 2 * self.MARGIN - 30) // line_height, line_height)
+
+        PROFILER.log_dir = c.PROFILE_DIR
+        PROFILER.set_level(c.PROFILE_LEVEL)
+        self.profiler_overlay = ProfilerOverlay(PROFILER, self.MARGIN, self.MARGIN + self.board_pixel_height)
+
+    def _setup_pieces(self, fen: str = START_FEN):
+        """Initializes and places all pieces on the board, from the starting position or any FEN."""
+        # Clear existing pieces before setting up new ones; their sprites go back to the pool for the new pieces
+        for piece in self.all_piece_objects:
+            piece.release_sprite()
         self.all_piece_objects.clear()
         self.piece_sprites.clear()
-        self.current_turn = self.WHITE # Reset turn to white
         self.promoting_pawn = None # Clear any promoting pawn
         self.game_over_message = None # Clear game over message
         self.move_history.clear() # Clear move history
         self.show_check_message_timer = 0.0 # Reset check message timer
+        self.endgame_message = None
+        if self.ai_player:
+            self.ai_player.cancel() # Stop a search still running in the worker
         self.ai_player = None # Reset AI player instance
         self.ai_color = None  # Reset AI color
 
-        # White pieces
-        for col in range(self.BOARD_SIZE):
-            p = Pawn(self.WHITE, 1, col); self.all_piece_objects.append(p); self.piece_sprites.append(p.sprite)
-        r1 = Rook(self.WHITE, 0, 0); self.all_piece_objects.append(r1); self.piece_sprites.append(r1.sprite)
-        r2 = Rook(self.WHITE, 0, 7); self.all_piece_objects.append(r2); self.piece_sprites.append(r2.sprite)
-        n1 = Knight(self.WHITE, 0, 1); self.all_piece_objects.append(n1); self.piece_sprites.append(n1.sprite)
-        n2 = Knight(self.WHITE, 0, 6); self.all_piece_objects.append(n2); self.piece_sprites.append(n2.sprite)
-        b1 = Bishop(self.WHITE, 0, 2); self.all_piece_objects.append(b1); self.piece_sprites.append(b1.sprite)
-        b2 = Bishop(self.WHITE, 0, 5); self.all_piece_objects.append(b2); self.piece_sprites.append(b2.sprite)
-        q = Queen(self.WHITE, 0, 3); self.all_piece_objects.append(q); self.piece_sprites.append(q.sprite)
-        k = King(self.WHITE, 0, 4); self.all_piece_objects.append(k); self.piece_sprites.append(k.sprite)
-
-        # Black pieces
-        for col in range(self.BOARD_SIZE):
-            p = Pawn(self.BLACK, 6, col); self.all_piece_objects.append(p); self.piece_sprites.append(p.sprite)
-        r1_b = Rook(self.BLACK, 7, 0); self.all_piece_objects.append(r1_b); self.piece_sprites.append(r1_b.sprite)
-        r2_b = Rook(self.BLACK, 7, 7); self.all_piece_objects.append(r2_b); self.piece_sprites.append(r2_b.sprite)
-        n1_b = Knight(self.BLACK, 7, 1); self.all_piece_objects.append(n1_b); self.piece_sprites.append(n1_b.sprite)
-        n2_b = Knight(self.BLACK, 7, 6); self.all_piece_objects.append(n2_b); self.piece_sprites.append(n2_b.sprite)
-        b1_b = Bishop(self.BLACK, 7, 2); self.all_piece_objects.append(b1_b); self.piece_sprites.append(b1_b.sprite)
-        b2_b = Bishop(self.BLACK, 7, 5); self.all_piece_objects.append(b2_b); self.piece_sprites.append(b2_b.sprite)
-        q_b = Queen(self.BLACK, 7, 3); self.all_piece_objects.append(q_b); self.piece_sprites.append(q_b.sprite)
-        k_b = King(self.BLACK, 7, 4); self.all_piece_objects.append(k_b); self.piece_sprites.append(k_b.sprite)
+        self.start_fen = fen
+        # Create a sprite piece for every piece in the FEN
+        position = parse_fen(fen)
+        for state in position:
+            piece = PIECE_CLASSES[state.piece_type](state.color, state.row, state.col)
+            self.all_piece_objects.append(piece)
+            self.piece_sprites.append(piece.sprite)
+        self.current_turn = position.side_to_move
+        self.all_piece_objects.side_to_move = position.side_to_move
+        self.all_piece_objects.castling_rights = position.castling_rights
+        self.all_piece_objects.ep_square = position.ep_square
+        self.all_piece_objects.halfmove_clock = position.halfmove_clock
+        self.all_piece_objects.fullmove_number = position.fullmove_number
+        self.move_counter += 1 # New board: cached legal moves are out of date
+
+    def get_fen(self) -> str:
+        """FEN of the current game state."""
+        return to_fen(self.all_piece_objects)
+
+    def game_result(self) -> str:
+        """PGN result: "1-0", "0-1" or "1/2-1/2" once the game is over, "*" while it goes on."""
+        if self.game_state != c.GAME_OVER:
+            return "*"
+        if self.move_history and self.move_history[-1].endswith("#"):
+            # The side that made the last move won
+            first_mover = parse_fen(self.start_fen).side_to_move
+            last_mover = first_mover if len(self.move_history) % 2 == 1 else \
+                (self.BLACK if first_mover == self.WHITE else self.WHITE)
+            return "1-0" if last_mover == self.WHITE else "0-1"
+        return "1/2-1/2" # Stalemate or insufficient material
+
+    def save_pgn(self) -> str:
+        """Writes the game so far to a new PGN file in c.PGN_SAVE_DIR. Returns its path."""
+        now = datetime.datetime.now()
+        names = {self.WHITE: "Player", self.BLACK: "Player"}
+        if self.game_mode == "pvc" and self.ai_color:
+            names[self.ai_color] = "Computer"
+        tags = {"Event": "Casual game", "Site": "Python Arcade Chess", "Date": now.strftime("%Y.%m.%d"),
+                "Round": "-", "White": names[self.WHITE], "Black": names[self.BLACK]}
+        if self.game_over_message:
+            tags["Termination"] = self.game_over_message
+        os.makedirs(c.PGN_SAVE_DIR, exist_ok=True)
+        path = os.path.join(c.PGN_SAVE_DIR, now.strftime("game_%Y%m%d_%H%M%S.pgn"))
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(pgn.format_game(self.move_history, self.game_result(), tags, self.start_fen))
+        print(f"Game saved to {path}")
+        return path
 
     def _draw_pieces(self):
         """Draws all the pieces on the board."""
         self.piece_sprites.draw()
 
+    def invalidate(self):
+        """Marks the window as changed, so the next frame is drawn."""
+        self.needs_redraw = True
+
+    def draw(self, delta_time: float):
+        """Draws a frame (on_draw, then the buffer flip) only when the scene changed, in on-demand mode.
+        Without a flip the screen keeps showing the last frame."""
+        if c.ON_DEMAND_REDRAW and not self.needs_redraw:
+            return
+        self.needs_redraw = False
+        super().draw(delta_time)
+
+    def on_resize(self, width: int, height: int):
+        super().on_resize(width, height)
+        self.invalidate()
+
+    def on_expose(self):
+        """The window was uncovered or shown, so its contents have to be drawn again."""
+        self.invalidate()
+
+    @PROFILER.timed("draw")
     def on_draw(self):
         self.clear()
 
@@ -99,6 +180,12 @@ class MyGame(arcade.Window):
             # Labels might be drawn over by promotion UI, consider order or conditional drawing
             self.board_renderer.draw_labels()
 
+            # Red square under the king of the side to move when it is in check.
+            # Asked every frame, so the attack map comes from the per-position cache.
+            king = self.all_piece_objects.king(self.current_turn)
+            if king is not None and ATTACK_CACHE.is_king_in_check(self.all_piece_objects, self.current_turn):
+                self.board_renderer.draw_check_highlight((king.row, king.col))
+
             # Draw selected square highlight (if a piece is selected)
             if self.input_handler.selected_piece_object:
                 self.board_renderer.draw_selected_square_highlight(
@@ -118,36 +205,30 @@ class MyGame(arcade.Window):
             if self.game_state == c.GAME_OVER:
                 # Display game over message (Checkmate or Stalemate)
                 message = self.game_over_message if self.game_over_message else "GAME OVER"
-                arcade.draw_text(message,
-                                self.width / 2, self.height / 2 - self.SQUARE_SIZE, # Position it clearly
-                                arcade.color.DARK_RED, font_size=40, anchor_x="center", bold=True)
+                TEXT_CACHE.draw(message,
+                               self.width / 2, self.height / 2 - self.SQUARE_SIZE, # Position it clearly
+                               arcade.color.DARK_RED, font_size=40, anchor_x="center", bold=True)
             
             # Draw "CHECK!" message if timer is active
             if self.show_check_message_timer > 0 and self.game_state == c.PLAYING:
                 # Calculate center of the board area for the "CHECK!" message
                 board_center_x = self.MARGIN + self.board_pixel_width / 2
                 board_center_y = self.MARGIN + self.board_pixel_height / 2
-                arcade.draw_text("CHECK!",
-                                board_center_x, board_center_y,
-                                arcade.color.DARK_RED, font_size=60, anchor_x="center", anchor_y="center", bold=True)
-
-            # Draw move history on the right side
-            history_start_x = self.board_pixel_width + 2 * self.MARGIN + 10 # Start X for history text
-            history_start_y = self.height - self.MARGIN - 30 # Start Y from top (use self.height)
-            line_height = 18
-            max_history_lines = (self.height - 2 * self.MARGIN - 30) // line_height # use self.height
-            
-            # Display latest moves first, or implement scrolling for full history
-            start_index = max(0, len(self.move_history) - max_history_lines)
-            for i, move_text in enumerate(self.move_history[start_index:]):
-                display_y = history_start_y - i * line_height
-                turn_number = (start_index + i) // 2 + 1
-                player_indicator = " " if (start_index + i) % 2 == 0 else "..." # White move vs Black move
-                formatted_move = f"{turn_number}.{player_indicator} {move_text}" if (start_index + i) % 2 == 0 else f"    {move_text}"
-                arcade.draw_text(formatted_move, history_start_x, display_y, arcade.color.BLACK, font_size=12)
+                TEXT_CACHE.draw("CHECK!",
+                               board_center_x, board_center_y,
+                               arcade.color.DARK_RED, font_size=60, anchor_x="center", anchor_y="center", bold=True)
+
+            # Draw move history on the right side (the latest moves that fit)
+            self.history_panel.draw(self.move_history)
+
+            if self.endgame_message and self.game_state == c.PLAYING:
+                TEXT_CACHE.draw(self.endgame_message, self.history_panel.x, self.MARGIN, arcade.color.DARK_BLUE, font_size=12)
+
+            self.profiler_overlay.draw()
 
     def on_mouse_press(self, x: int, y: int, button: int, modifiers: int):
         """Called when the user presses a mouse button."""
+        self.invalidate() # Clicks select pieces, make moves and press buttons
         clicked_button_action = self.game_ui.handle_mouse_press(x, y, self.game_state)
 
         if clicked_button_action:
@@ -159,7 +240,9 @@ class MyGame(arcade.Window):
                         self.ai_color = self.BLACK
                     else:
                         self.ai_color = self.WHITE
-                    self.ai_player = AIPlayer(self, self.ai_color)
+                    self.ai_player = AIPlayer(self, self.ai_color, c.AI_MODE, c.AI_TIME_LIMIT, c.AI_MAX_DEPTH,
+                                            c.AI_TT_SIZE_MB, c.AI_USE_WORKER, c.AI_WORKERS, c.AI_USE_BOOK,
+                                            c.AI_USE_TABLEBASES)
                     print(f"AI will play as {self.ai_color}")
             elif clicked_button_action == "new_game": # Goes back to SETUP screen
                 print("New Game button clicked!")
@@ -177,6 +260,8 @@ class MyGame(arcade.Window):
                 self.game_state = c.PLAYING # Ensure game is in PLAYING state
                 # self.game_over_message = None # Already handled in _setup_pieces
                 # Any "Check!" message or game over state should be cleared implicitly by _setup_pieces and state change
+            elif clicked_button_action == "save_pgn":
+                self.save_pgn()
             elif clicked_button_action == "white_color":
                 if self.game_state == c.SETUP:
                     print("Selected White")
@@ -207,42 +292,26 @@ class MyGame(arcade.Window):
                     # Remove pawn
                     if pawn in self.all_piece_objects:
                         self.all_piece_objects.remove(pawn)
-                    if pawn.sprite in self.piece_sprites:
-                        self.piece_sprites.remove(pawn.sprite)
-                    
+                    pawn.release_sprite() # The new piece reuses it
+
                     # Add new piece
                     new_piece = new_piece_type(pawn.color, pawn.row, pawn.col)
                     self.all_piece_objects.append(new_piece)
                     self.piece_sprites.append(new_piece.sprite)
+                    self.move_counter += 1
                     print(f"Pawn promoted to {new_piece.piece_type}")
-                    promoted_char_for_notation = move_logic.get_promoted_piece_char(new_piece.piece_type) # e.g. "Q"
-
-                    # Algebraic notation for the promotion part
-                    # The move to the promotion square was already noted by InputHandler.
-                    # Here we complete it with "=Q", and check/mate status *after* new piece is on board.
-                    # original_piece_info for the pawn was captured in InputHandler.
-                    # We need the state of the board *before* the pawn was replaced.
-                    # This is tricky as InputHandler doesn't easily pass that original board state here.
-                    # For simplicity, we'll print the "=Q+#" part based on current board.
-                    
-                    # Update the last move in history with the promotion suffix
+                    # Complete the pawn's notation (e.g. "e8") with "=Q" and the check / mate
+                    # caused by the new piece, from the opponent's legal moves (cached for _check_for_check)
                     opponent_color_after_promo = self.BLACK if new_piece.color == self.WHITE else self.WHITE
-                    check_after_promo_choice = move_logic.is_king_in_check(opponent_color_after_promo, self.all_piece_objects, self.BOARD_SIZE)
-                    checkmate_after_promo_choice = False
-                    if check_after_promo_choice:
-                        if not self.input_handler._has_legal_moves(opponent_color_after_promo): # Check opponent
-                            checkmate_after_promo_choice = True
+                    opponent_moves = self.input_handler.legal_moves(opponent_color_after_promo)
+                    promo_suffix = "=" + san.SAN_LETTERS[new_piece.piece_type]
+                    promo_suffix += san.check_suffix(opponent_moves.checkers, opponent_moves.moves)
+                    if opponent_moves.checkers:
+                        if not opponent_moves.moves:
                             self.game_over_message = f"CHECKMATE! {new_piece.color.upper()} wins." # Set mate message here
                             self.game_state = c.GAME_OVER # End game on mate by promotion
                         else: # Just a check, not mate
                             self.show_check_message_timer = c.CHECK_MESSAGE_DURATION
-
-                    # This is a simplified notation for the promotion suffix.
-                    # A full algebraic move would combine the pawn's move and the promotion.
-                    # e.g. if InputHandler printed "e8", this would add "=Q#"
-                    promo_suffix = "=" + promoted_char_for_notation if promoted_char_for_notation else ""
-                    if checkmate_after_promo_choice: promo_suffix += "#"
-                    elif check_after_promo_choice: promo_suffix += "+"
                     print(f"Promotion completed: {promo_suffix}")
                     
                     if self.move_history:
@@ -253,6 +322,7 @@ class MyGame(arcade.Window):
                         self.game_state = c.PLAYING
                         # Switch turn and check for check (if game not over)
                         self.current_turn = opponent_color_after_promo # It's now the opponent's turn
+                        self.all_piece_objects.side_to_move = self.current_turn
                         print(f"Turn: {self.current_turn}")
                         # _check_for_check here would check if the current player (whose turn it became)
                         # is now in mate/stalemate due to the board state after promotion.
@@ -265,27 +335,42 @@ class MyGame(arcade.Window):
             # If no UI button was clicked and game is playing, handle board interaction
             self.input_handler.on_mouse_press(x, y, button, modifiers)
 
-    def update(self, delta_time: float):
+    def on_key_press(self, symbol: int, modifiers: int):
+        if symbol == arcade.key.F3:
+            # Timings overlay; profiling runs while it is shown even if c.PROFILE_LEVEL is off
+            self.profiler_overlay.visible = not self.profiler_overlay.visible
+            PROFILER.set_level(max(c.PROFILE_LEVEL, TIMING) if self.profiler_overlay.visible else c.PROFILE_LEVEL)
+            self.invalidate()
+
+    @PROFILER.timed("update")
+    def on_update(self, delta_time: float):
         """ Game logic updated every frame """
+        if self.profiler_overlay.visible:
+            self.invalidate() # Keep drawing, so frame times keep coming in
         if self.show_check_message_timer > 0:
             self.show_check_message_timer -= delta_time
-            if self.show_check_message_timer < 0:
+            if self.show_check_message_timer <= 0:
                 self.show_check_message_timer = 0
+                self.invalidate() # Take the "CHECK!" message down
 
         if self.game_mode == "pvc" and self.game_state == c.PLAYING and \
             self.current_turn == self.ai_color and self.ai_player and self.show_check_message_timer <= 0:
-            print(f"DEBUG: AI ({self.ai_color}) turn. Attempting to choose move.")
-            ai_move_choice = self.ai_player.choose_move()
+            # poll_move doesn't block when the AI thinks in a worker process:
+            # it returns None until the search is done.
+            ai_move_choice = self.ai_player.poll_move()
             if ai_move_choice:
-                print(f"DEBUG: AI chose move: {ai_move_choice[0].piece_type} to {ai_move_choice[1]}")
+                PROFILER.event("ai_move", piece=ai_move_choice[0].piece_type, to=ai_move_choice[1])
                 piece_to_move, (dest_row, dest_col) = ai_move_choice
                 self.input_handler.execute_move(piece_to_move, dest_row, dest_col, is_ai_move=True)
-            else:
-                print(f"DEBUG: AI ({self.ai_color}) did not choose a move (choose_move returned None).")
+                self.invalidate()
 
 def main():
     game = MyGame()
     arcade.run()
+    ai_worker.shutdown_pool()
+    profile_path = PROFILER.close()
+    if profile_path:
+        print(f"Profile saved to {profile_path}")
 
 if __name__ == "__main__":
     main()
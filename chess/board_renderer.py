@@ -1,7 +1,20 @@
+import math
 import arcade
+import pyglet
+from arcade.shape_list import ShapeElementList, create_triangles_filled_with_colors
 import components.constants as c
 
+HIGHLIGHT_SEGMENTS = 32 # Triangles per move highlight circle
+
 class BoardRenderer:
+    """
+    Draws the board, its labels and the move highlights. The squares and the
+    labels never change, so they are built once into a shape list and a text
+    batch and drawn with one call each; the move highlights are kept in a
+    shape list that is rebuilt only when the highlighted squares change.
+    Both are plain triangle lists: arcade's rectangle and circle shapes are
+    triangle / line strips, which don't join up in a shape list.
+    """
     def __init__(self, square_size: int, board_size: int, margin: int):
         self.SQUARE_SIZE = square_size
         self.BOARD_SIZE = board_size
@@ -13,10 +26,20 @@ class BoardRenderer:
         self.top_labels = []
         self.left_labels = []
         self.right_labels = []
+        self.label_batch = pyglet.graphics.Batch() # All the labels, drawn together
         self._create_labels_as_text_objects()
 
-    def draw_board(self):
-        """Draws the chessboard squares."""
+        self.board_shapes = self._create_board_shapes()
+        self.highlight_shapes = ShapeElementList()
+        self.highlighted_coords: tuple[tuple[int, int], ...] = () # What highlight_shapes shows
+
+    def _square_center(self, row: int, col: int) -> tuple[int, int]:
+        return (self.MARGIN + col * self.SQUARE_SIZE + self.SQUARE_SIZE // 2,
+                self.MARGIN + row * self.SQUARE_SIZE + self.SQUARE_SIZE // 2)
+
+    def _create_board_shapes(self) -> ShapeElementList:
+        """The 64 squares as one shape list, two triangles per square."""
+        points, colors = [], []
         for row in range(self.BOARD_SIZE):
             for col in range(self.BOARD_SIZE):
                 left = col * self.SQUARE_SIZE + self.MARGIN
@@ -28,7 +51,15 @@ class BoardRenderer:
                     color = c.PICTON_BLUE
                 else:
                     color = c.BISQUE
-                arcade.draw_lrbt_rectangle_filled(left, right, bottom, top, color)
+                points += [(left, bottom), (right, bottom), (right, top), (left, bottom), (right, top), (left, top)]
+                colors += [color] * 6
+        shapes = ShapeElementList()
+        shapes.append(create_triangles_filled_with_colors(points, colors))
+        return shapes
+
+    def draw_board(self):
+        """Draws the chessboard squares."""
+        self.board_shapes.draw()
 
     def _create_labels_as_text_objects(self):
         """Creates arcade.Text objects for all labels."""
@@ -38,7 +69,7 @@ class BoardRenderer:
             text_x = self.MARGIN + col * self.SQUARE_SIZE + self.SQUARE_SIZE // 2
             text_y = self.MARGIN // 2
             self.bottom_labels.append(arcade.Text(label_text, text_x, text_y, c.LABEL_COLOR,
-                font_size=c.LABEL_FONT_SIZE, anchor_x="center", anchor_y="center"))
+                font_size=c.LABEL_FONT_SIZE, anchor_x="center", anchor_y="center", batch=self.label_batch))
 
         # Draw A-H labels above the board
         for i in range(self.BOARD_SIZE):
@@ -47,7 +78,7 @@ class BoardRenderer:
             text_x = self.MARGIN + i * self.SQUARE_SIZE + self.SQUARE_SIZE // 2
             text_y = self.MARGIN + self.board_pixel_height + self.MARGIN // 2
             self.top_labels.append(arcade.Text(label_text, text_x, text_y, c.LABEL_COLOR,
-                font_size=c.LABEL_FONT_SIZE, anchor_x="center", anchor_y="center"))
+                font_size=c.LABEL_FONT_SIZE, anchor_x="center", anchor_y="center", batch=self.label_batch))
 
         # Draw 1-8 labels to the left of the board
         for row in range(self.BOARD_SIZE):
@@ -55,7 +86,7 @@ class BoardRenderer:
             text_x = self.MARGIN // 2
             text_y = self.MARGIN + row * self.SQUARE_SIZE + self.SQUARE_SIZE // 2
             self.left_labels.append(arcade.Text(label_text, text_x, text_y, c.LABEL_COLOR,
-                font_size=c.LABEL_FONT_SIZE, anchor_x="center", anchor_y="center"))
+                font_size=c.LABEL_FONT_SIZE, anchor_x="center", anchor_y="center", batch=self.label_batch))
 
         # Draw 1-8 labels to the right of the board
         for row in range(self.BOARD_SIZE):
@@ -63,24 +94,52 @@ class BoardRenderer:
             text_x = self.MARGIN + self.board_pixel_width + self.MARGIN // 2
             text_y = self.MARGIN + row * self.SQUARE_SIZE + self.SQUARE_SIZE // 2
             self.right_labels.append(arcade.Text(label_text, text_x, text_y, c.LABEL_COLOR,
-                font_size=c.LABEL_FONT_SIZE, anchor_x="center", anchor_y="center"))
+                font_size=c.LABEL_FONT_SIZE, anchor_x="center", anchor_y="center", batch=self.label_batch))
 
     def draw_labels(self):
         """Draws the algebraic notation labels around the board."""
-        for label_list in [self.bottom_labels, self.top_labels, self.left_labels, self.right_labels]:
-            for label in label_list:
-                label.draw()
+        self.label_batch.draw()
 
-    def draw_highlighted_moves(self, coords: list[tuple[int, int]]):
+    def _update_highlight_shapes(self, coords: tuple[tuple[int, int], ...]):
+        """Rebuilds the move highlights for new squares: a filled circle with a ring around it on each."""
+        self.highlight_shapes.clear()
+        self.highlighted_coords = coords
+        if not coords:
+            return
+        radius = self.SQUARE_SIZE * 0.2
+        fill_color = c.HIGHLIGHT_MOVE_FILL_COLOR # Usar el nuevo verde claro
+        border_color = c.BUTTON_ORANGE # Usamos el naranja para el borde
+        border_width = 3 # Ancho del borde en píxeles
+        inner = radius - border_width # The ring is drawn inside the circle's edge
+        outer = radius
+        angles = [2 * math.pi * i / HIGHLIGHT_SEGMENTS for i in range(HIGHLIGHT_SEGMENTS + 1)]
+        unit = [(math.cos(angle), math.sin(angle)) for angle in angles]
+
+        points, colors = [], []
         for row, col in coords:
-            center_x = self.MARGIN + col * self.SQUARE_SIZE + self.SQUARE_SIZE // 2
-            center_y = self.MARGIN + row * self.SQUARE_SIZE + self.SQUARE_SIZE // 2
-            radius = self.SQUARE_SIZE * 0.2
-            fill_color = c.HIGHLIGHT_MOVE_FILL_COLOR # Usar el nuevo verde claro
-            border_color = c.BUTTON_ORANGE # Usamos el naranja para el borde
-            border_width = 3 # Ancho del borde en píxeles
-            arcade.draw_circle_filled(center_x, center_y, radius, fill_color) # Dibujar relleno verde
-            arcade.draw_circle_outline(center_x, center_y, radius, border_color, border_width)
+            x, y = self._square_center(row, col)
+            for (x1, y1), (x2, y2) in zip(unit, unit[1:]):
+                points += [(x, y), (x + x1 * radius, y + y1 * radius), (x + x2 * radius, y + y2 * radius)]
+                colors += [fill_color] * 3
+                points += [(x + x1 * inner, y + y1 * inner), (x + x1 * outer, y + y1 * outer), (x + x2 * outer, y + y2 * outer),
+                           (x + x1 * inner, y + y1 * inner), (x + x2 * outer, y + y2 * outer), (x + x2 * inner, y + y2 * inner)]
+                colors += [border_color] * 6
+        self.highlight_shapes.append(create_triangles_filled_with_colors(points, colors))
+
+    def draw_highlighted_moves(self, coords: list[tuple[int, int]]):
+        """Draws a circle on each square in coords (the selected piece's moves)."""
+        coords = tuple(coords)
+        if coords != self.highlighted_coords:
+            self._update_highlight_shapes(coords)
+        self.highlight_shapes.draw()
+
+    def draw_check_highlight(self, coord: tuple[int, int]):
+        """Draws a red highlight under a king that is in check."""
+        row, col = coord
+        left = col * self.SQUARE_SIZE + self.MARGIN
+        bottom = row * self.SQUARE_SIZE + self.MARGIN
+        arcade.draw_lrbt_rectangle_filled(left, left + self.SQUARE_SIZE, bottom, bottom + self.SQUARE_SIZE,
+                                        c.CHECK_HIGHLIGHT_COLOR)
 
     def draw_selected_square_highlight(self, coord: tuple[int, int]):
         """Draws a highlight on the selected piece's square."""
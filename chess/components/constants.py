@@ -1,4 +1,5 @@
 # c:\Users\hualc\OneDrive-BYU-Idaho\Documents\Portfolio\My-Portfolio\chess\constants.py
+import os
 import arcade
 
 # Game States
@@ -29,9 +30,30 @@ HIGHLIGHT_YELLOW_TRANSPARENT = (arcade.color.YELLOW[0], arcade.color.YELLOW[1],
 PAWN_PROMOTION = 3
 SELECTED_SQUARE_HIGHLIGHT_COLOR = arcade.color.YELLOW # For the square of the selected piece
 HIGHLIGHT_MOVE_FILL_COLOR = arcade.color.LIGHT_GREEN # Lighter green for possible move circles
+CHECK_HIGHLIGHT_COLOR = (arcade.color.RED[0], arcade.color.RED[1], arcade.color.RED[2], 140) # Under a king in check
 HISTORY_AREA_WIDTH = 200
 CHECK_MESSAGE_DURATION = 2.0
+ON_DEMAND_REDRAW = True # Only redraw the window when something on it changed, so an idle game uses no CPU/GPU for drawing
 
+# Computer player
+AI_MODE = "search" # "search" (alpha-beta) or "random"
+AI_TIME_LIMIT = 1.0 # Seconds the search may think per move
+AI_MAX_DEPTH = 4 # Iterative deepening stops at this depth
+AI_TT_SIZE_MB = 16 # Memory for the search's transposition table
+AI_USE_WORKER = True # Think in a worker process so the window keeps drawing
+# Processes searching in parallel (Lazy SMP with a shared table); more than 1 searches in the pool even
+# without AI_USE_WORKER. Kept low so several games on one machine don't each take every core.
+AI_WORKERS = min(2, os.cpu_count() or 1)
+AI_USE_TABLEBASES = True # Play endings perfectly when data/tablebases has a table for them (see moves/tablebase.py)
+AI_USE_BOOK = True # Play the first moves from the opening book in data/ (compiled from data/openings.txt)
+
+# Saved games
+PGN_SAVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "saved_games") # "Save PGN" writes here
+
+# Profiling (components/profiler.py): 0 off, 1 frame and engine timings, 2 timings and debug events.
+# F3 shows the timings overlay (and times while it is shown, whatever the level).
+PROFILE_LEVEL = 0
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "profiles") # CSV / JSON timing logs
 
 # Screen
 SCREEN_TITLE = "Chess"
@@ -16,6 +16,56 @@ def get_image_path(piece_type: str, color: str) -> str:
     prefix = "w_" if color == WHITE else "b_"
     return os.path.join(ASSET_PATH, f"{prefix}{piece_type}.png")
 
+PIECE_TYPES = ("pawn", "knight", "bishop", "rook", "queen", "king")
+
+# Each piece image is decoded once and the texture shared by every sprite
+# showing it, so the sprite lists' texture atlas holds 12 images
+_textures: dict[tuple[str, str], arcade.Texture] = {}
+
+def get_texture(piece_type: str, color: str) -> arcade.Texture:
+    """Texture of a piece, loaded from its image the first time it's asked for."""
+    key = (piece_type, color)
+    texture = _textures.get(key)
+    if texture is None:
+        texture = arcade.load_texture(get_image_path(piece_type, color))
+        _textures[key] = texture
+    return texture
+
+def load_textures():
+    """Loads all 12 piece textures (at startup, so the first game doesn't wait on them)."""
+    for color in (WHITE, BLACK):
+        for piece_type in PIECE_TYPES:
+            get_texture(piece_type, color)
+
+
+class SpritePool:
+    """
+    Sprites of pieces that left the board (captured, promoted, or cleared by a
+    reset), kept to be given to new pieces. A sprite's texture is swapped to
+    the new piece's, so after the first game setup pieces don't create sprites.
+    """
+    def __init__(self):
+        self._free: list[arcade.Sprite] = []
+
+    def acquire(self, piece_type: str, color: str) -> arcade.Sprite:
+        texture = get_texture(piece_type, color)
+        if self._free:
+            sprite = self._free.pop()
+            sprite.texture = texture
+            sprite.scale = PIECE_SCALE
+            return sprite
+        return arcade.Sprite(texture, PIECE_SCALE)
+
+    def release(self, sprite: arcade.Sprite):
+        sprite.remove_from_sprite_lists()
+        self._free.append(sprite)
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+SPRITE_POOL = SpritePool()
+
+
 class Piece:
     def __init__(self, piece_type: str, color: str, row: int, col: int):
         self.piece_type = piece_type
@@ -23,8 +73,7 @@ class Piece:
         self.row = row
         self.col = col
 
-        image_path = get_image_path(self.piece_type, self.color)
-        self.sprite = arcade.Sprite(image_path, PIECE_SCALE)
+        self.sprite = SPRITE_POOL.acquire(self.piece_type, self.color) # Recycled if one is free
         self.update_sprite_position()
     
     def update_sprite_position(self):
@@ -32,6 +81,10 @@ class Piece:
         self.sprite.center_y = MARGIN + self.row * SQUARE_SIZE + SQUARE_SIZE // 2
 
 
+    def release_sprite(self):
+        """Takes the piece's sprite off the board and returns it to the pool."""
+        SPRITE_POOL.release(self.sprite)
+
     def draw(self):
         self.sprite.draw()
 
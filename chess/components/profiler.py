@@ -0,0 +1,147 @@
+"""
+Frame-time and engine-latency profiling for the game window.
+
+Code sections (drawing a frame, the per-frame update, move highlighting,
+check detection, the AI's move choice) are wrapped with PROFILER.timed().
+With profiling on, every call's duration is kept in a rolling window per
+section, for p50 / p95 / p99 in the overlay (F3 in the game), and written
+to a CSV log. PROFILER.save() writes a JSON summary next to it.
+PROFILER.event() replaces debug prints: at the DEBUG level events are kept
+for the summary and printed, below it they are dropped.
+
+The levels are OFF, TIMING (timings and logs) and DEBUG (timings and
+events). Turned off, a timed function costs one attribute check, and an
+event costs a level comparison. Callers check PROFILER.debug before
+building an expensive event.
+"""
+
+import csv
+import datetime
+import json
+import math
+import os
+import time
+from collections import deque
+from functools import wraps
+
+OFF, TIMING, DEBUG = 0, 1, 2
+LEVEL_NAMES = {OFF: "off", TIMING: "timing", DEBUG: "debug"}
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values (0.0 for none)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class Profiler:
+    def __init__(self, level: int = OFF, window: int = 300, log_dir: str | None = None):
+        self.window = window # Samples per section the percentiles are taken over
+        self.log_dir = log_dir # Where the CSV / JSON logs go; None keeps no logs
+        self.samples: dict[str, deque[float]] = {} # Section -> last durations in seconds
+        self.totals: dict[str, list] = {} # Section -> [count, sum, max] since profiling started
+        self.events: deque[dict] = deque(maxlen=1000)
+        self._start = time.perf_counter()
+        self._csv_file = None
+        self._csv = None
+        self.log_path: str | None = None # CSV of every sample, opened on the first one
+        self.set_level(level)
+
+    def set_level(self, level: int):
+        self.level = level
+        self.enabled = level >= TIMING # Plain attributes: checked on every timed call
+        self.debug = level >= DEBUG
+
+    def record(self, section: str, seconds: float):
+        """Adds one duration of section."""
+        samples = self.samples.get(section)
+        if samples is None:
+            samples = self.samples[section] = deque(maxlen=self.window)
+            self.totals[section] = [0, 0.0, 0.0]
+        samples.append(seconds)
+        totals = self.totals[section]
+        totals[0] += 1
+        totals[1] += seconds
+        if seconds > totals[2]:
+            totals[2] = seconds
+        if self.log_dir is not None:
+            if self._csv is None:
+                self._open_csv()
+            self._csv.writerow((f"{time.perf_counter() - self._start:.6f}", section, f"{seconds * 1000:.4f}"))
+
+    def timed(self, section: str):
+        """Decorator timing every call of a function as section, while profiling is on."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(section, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def event(self, name: str, **fields):
+        """A structured debug message, e.g. event("ai_book_move", move="e2e4"). Only kept at the DEBUG level."""
+        if self.level < DEBUG:
+            return
+        fields = {"time": round(time.perf_counter() - self._start, 6), "event": name, **fields}
+        self.events.append(fields)
+        print(" ".join(f"{key}={value}" for key, value in fields.items()))
+
+    def stats(self, section: str) -> dict[str, float]:
+        """Last duration and p50 / p95 / p99 over the rolling window, in milliseconds."""
+        samples = self.samples.get(section)
+        if not samples:
+            return {"count": 0, "last_ms": 0.0, "mean_ms": 0.0, "max_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+        ordered = sorted(samples)
+        count, total, longest = self.totals[section]
+        return {"count": count, "last_ms": samples[-1] * 1000, "mean_ms": total / count * 1000,
+                "max_ms": longest * 1000, "p50_ms": percentile(ordered, 0.50) * 1000,
+                "p95_ms": percentile(ordered, 0.95) * 1000, "p99_ms": percentile(ordered, 0.99) * 1000}
+
+    def summary(self) -> dict:
+        return {"level": LEVEL_NAMES[self.level], "window": self.window,
+                "seconds": time.perf_counter() - self._start,
+                "sections": {section: self.stats(section) for section in self.samples},
+                "events": list(self.events)}
+
+    def save(self, path: str | None = None) -> str | None:
+        """Writes the JSON summary (to the CSV log's name with .json by default). Returns its path."""
+        if path is None:
+            if self.log_path is None: # No logs kept, or nothing timed yet
+                return None
+            path = os.path.splitext(self.log_path)[0] + ".json"
+        if self._csv_file is not None:
+            self._csv_file.flush()
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.summary(), file, indent=2)
+        return path
+
+    def close(self) -> str | None:
+        """Saves the summary and closes the CSV log (at exit). Returns the summary's path."""
+        path = self.save()
+        self._close_csv()
+        return path
+
+    def _open_csv(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        name = datetime.datetime.now().strftime("profile_%Y%m%d_%H%M%S")
+        self.log_path = os.path.join(self.log_dir, name + ".csv")
+        self._csv_file = open(self.log_path, "w", newline="", encoding="utf-8")
+        self._csv = csv.writer(self._csv_file)
+        self._csv.writerow(("time_s", "section", "ms"))
+
+    def _close_csv(self):
+        if self._csv_file is not None:
+            self._csv_file.close()
+        self._csv_file = None
+        self._csv = None
+
+# Shared by the window, the input handler and the AI; the game sets its level from c.PROFILE_LEVEL
+PROFILER = Profiler()
@@ -0,0 +1,51 @@
+"""
+Pre-built arcade.Text objects, reused from frame to frame.
+
+arcade.draw_text() lays the text out again on every call, which costs more
+than drawing it. The labels, banners and button captions of the game are
+the same from one frame to the next, so TextCache keeps one arcade.Text per
+(text, position, style) and draws that; it is only laid out the first time.
+Text that changes (e.g. the game-over message) adds a new entry, and the
+least recently used ones are dropped past max_entries.
+"""
+
+from collections import OrderedDict
+
+import arcade
+
+
+class TextCache:
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._texts: OrderedDict[tuple, arcade.Text] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str, x: float, y: float, color=arcade.color.BLACK, font_size: float = 12,
+            **style) -> arcade.Text:
+        """The arcade.Text for these arguments (the same ones as arcade.draw_text), built on first use."""
+        cache_key = (text, x, y, tuple(color), font_size, tuple(sorted(style.items())))
+        text_object = self._texts.get(cache_key)
+        if text_object is not None:
+            self._texts.move_to_end(cache_key)
+            self.hits += 1
+            return text_object
+        self.misses += 1
+        text_object = arcade.Text(text, x, y, color, font_size=font_size, **style)
+        self._texts[cache_key] = text_object
+        if len(self._texts) > self.max_entries:
+            self._texts.popitem(last=False) # Least recently used
+        return text_object
+
+    def draw(self, text: str, x: float, y: float, color=arcade.color.BLACK, font_size: float = 12, **style):
+        """Drop-in for arcade.draw_text()."""
+        self.get(text, x, y, color, font_size, **style).draw()
+
+    def clear(self):
+        self._texts.clear()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+# Shared by the game window and its UI
+TEXT_CACHE = TextCache()
@@ -1,5 +1,6 @@
 import arcade
 import components.constants as c
+from components.text_cache import TEXT_CACHE # Button labels and titles, laid out once
 
 class GameUI:
     def __init__(self, window_width: int, window_height: int):
@@ -69,14 +70,18 @@ class GameUI:
         button_spacing = 20
 
         self.gameplay_buttons = {
-            "reset_board": {"center_x": self.window_width / 2 - button_width / 2 - button_spacing / 2,
+            "reset_board": {"center_x": self.window_width / 2 - button_width - button_spacing,
                             "center_y": gameplay_button_y, "width": button_width, "height": 40,
                             "text": "Reset Board", "color": c.BUTTON_ORANGE,
                             "text_color": c.BUTTON_TEXT_BLACK, "font_size": 16, "action": "reset_board"},
-            "new_game": {"center_x": self.window_width / 2 + button_width / 2 + button_spacing / 2,
+            "new_game": {"center_x": self.window_width / 2,
                         "center_y": gameplay_button_y, "width": button_width, "height": 40,
                         "text": "New Game", "color": c.BUTTON_RED,
                         "text_color": c.BUTTON_TEXT_WHITE, "font_size": 16, "action": "new_game"},
+            "save_pgn": {"center_x": self.window_width / 2 + button_width + button_spacing,
+                        "center_y": gameplay_button_y, "width": button_width, "height": 40,
+                        "text": "Save PGN", "color": c.BUTTON_GREEN,
+                        "text_color": c.BUTTON_TEXT_BLACK, "font_size": 16, "action": "save_pgn"},
         }
 
         # For PAWN_PROMOTION state
@@ -110,9 +115,9 @@ class GameUI:
         top = button_props["center_y"] + half_height
 
         arcade.draw_lrbt_rectangle_filled(left, right, bottom, top, button_props["color"])
-        arcade.draw_text(button_props["text"], button_props["center_x"], button_props["center_y"],
-                        button_props["text_color"], font_size=button_props["font_size"],
-                        anchor_x="center", anchor_y="center")
+        TEXT_CACHE.draw(button_props["text"], button_props["center_x"], button_props["center_y"],
+                       button_props["text_color"], font_size=button_props["font_size"],
+                       anchor_x="center", anchor_y="center")
 
     def _is_point_in_button(self, x, y, button_props):
         """Checks if a point (x, y) is inside a button."""
@@ -122,8 +127,8 @@ class GameUI:
     def draw(self, game_state: int):
         """Draws UI elements based on the game state."""
         if game_state == c.SETUP:
-            arcade.draw_text("Game Setup", self.window_width / 2, self.window_height / 2 + 180,
-                            arcade.color.BLACK, font_size=30, anchor_x="center")
+            TEXT_CACHE.draw("Game Setup", self.window_width / 2, self.window_height / 2 + 180,
+                           arcade.color.BLACK, font_size=30, anchor_x="center")
             for button_props in self.setup_buttons.values():
                 self._draw_button(button_props)
         elif game_state == c.PLAYING or game_state == c.GAME_OVER:
@@ -131,8 +136,8 @@ class GameUI:
             for button_props in self.gameplay_buttons.values():
                 self._draw_button(button_props)
         elif game_state == c.PAWN_PROMOTION:
-            arcade.draw_text("Promote Pawn to:", self.window_width / 2, self.window_height / 2 + 100,
-                            arcade.color.BLACK, font_size=24, anchor_x="center")
+            TEXT_CACHE.draw("Promote Pawn to:", self.window_width / 2, self.window_height / 2 + 100,
+                           arcade.color.BLACK, font_size=24, anchor_x="center")
             for button_props in self.promotion_buttons.values():
                 self._draw_button(button_props)
 
@@ -0,0 +1,63 @@
+import arcade
+import pyglet
+
+class MoveHistoryPanel:
+    """
+    The move list on the right of the board, showing the latest moves that fit.
+
+    Only the visible lines have arcade.Text objects, all in one batch. When
+    a move is added only its line is laid out: the older lines are moved up
+    a row (which doesn't lay them out again), and the line that scrolls off
+    the top is reused for the new move. So a long game draws as fast as a
+    short one.
+    """
+    def __init__(self, x: float, top_y: float, max_lines: int, line_height: int = 18,
+                 color=arcade.color.BLACK, font_size: int = 12):
+        self.x = x
+        self.top_y = top_y
+        self.max_lines = max(1, max_lines)
+        self.line_height = line_height
+        self.color = color
+        self.font_size = font_size
+        self.batch = pyglet.graphics.Batch()
+        self.lines: dict[int, arcade.Text] = {} # Ply index -> its visible line
+        self._shown: dict[int, str | None] = {} # Ply index -> the text its line shows
+        self._free: list[arcade.Text] = [] # Lines scrolled off or cleared, for reuse
+
+    @staticmethod
+    def format_line(index: int, move_text: str) -> str:
+        """White's moves get the move number, black's are indented under them."""
+        if index % 2 == 0:
+            return f"{index // 2 + 1}.  {move_text}"
+        return f"    {move_text}"
+
+    def update(self, move_history: list[str]):
+        """Brings the lines up to date with move_history. Costs nothing when it hasn't changed."""
+        start_index = max(0, len(move_history) - self.max_lines)
+        for index in [index for index in self.lines if not start_index <= index < len(move_history)]:
+            line = self.lines.pop(index)
+            del self._shown[index]
+            line.visible = False
+            self._free.append(line)
+
+        for index in range(start_index, len(move_history)):
+            move_text = move_history[index]
+            y = self.top_y - (index - start_index) * self.line_height
+            line = self.lines.get(index)
+            if line is None:
+                if self._free:
+                    line = self._free.pop()
+                    line.visible = True
+                else:
+                    line = arcade.Text("", self.x, y, self.color, font_size=self.font_size, batch=self.batch)
+                self.lines[index] = line
+                self._shown[index] = None
+            if self._shown[index] != move_text: # New, or the promotion piece was added
+                line.text = self.format_line(index, move_text)
+                self._shown[index] = move_text
+            if line.y != y:
+                line.y = y
+
+    def draw(self, move_history: list[str]):
+        self.update(move_history)
+        self.batch.draw()
@@ -1,29 +1,201 @@
 # c:\Users\hualc\OneDrive-BYU-Idaho\Documents\Portfolio\My-Portfolio\chess\moves\ai_player.py
 import random
+import time
 from components.pieces import Piece # For type hinting
-# Import move_logic if needed for specific AI strategies, not for random moves via InputHandler
+from components.profiler import PROFILER # Timings and debug events
+from moves import bitboard, move_logic
+from moves.position import Position, Move
+from moves.search import Searcher
+from moves.transposition import TranspositionTable
+from moves.ai_worker import AsyncSearch
+from moves.book import OpeningBook, open_default_book
 
 class AIPlayer:
-    def __init__(self, game_instance, color: str):
+    def __init__(self, game_instance, color: str, mode: str = "random", time_limit: float = 1.0, max_depth: int = 4,
+                tt_size_mb: float = 16, use_worker: bool = False, workers: int = 1, use_book: bool = False,
+                use_tablebases: bool = False):
         self.game = game_instance
         self.color = color # The color this AI plays as
+        self.mode = mode # "random" or "search" (alpha-beta)
+        self.workers = max(1, workers) # Processes for a parallel (Lazy SMP) search; more than 1 always uses the pool
+        # Search in a worker process instead of the frame callback. A parallel search always does,
+        # so poll_move() never waits for the pool on the frame thread.
+        self.use_worker = (use_worker or self.workers > 1) and mode == "search"
+        self.last_search_stats: dict | None = None
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.tt_size_mb = tt_size_mb
+        self._searcher: Searcher | None = None # In-process search, created on first use
+        self.pending_search: AsyncSearch | None = None
+        self.use_book = use_book and mode == "search" # Play opening book moves without searching
+        self._book: OpeningBook | None = None
+        self.use_tablebases = use_tablebases and mode == "search" # Play endgames the tablebases cover perfectly
 
+    @property
+    def book(self) -> OpeningBook | None:
+        if self._book is None and self.use_book:
+            self._book = open_default_book()
+            self.use_book = self._book is not None
+        return self._book
+
+    @property
+    def searcher(self) -> Searcher:
+        if self._searcher is None:
+            self._searcher = Searcher(self.time_limit, self.max_depth, TranspositionTable(self.tt_size_mb))
+        return self._searcher
+
+    def poll_move(self) -> tuple[Piece, tuple[int, int]] | None:
+        """
+        Non-blocking version of choose_move for the game loop. In worker mode the
+        first call starts a search and later calls return None until it finishes;
+        otherwise this is just choose_move().
+        """
+        if not self.use_worker:
+            return self.choose_move()
+        if self.pending_search is None:
+            known_move = self._tablebase_move() or self._book_move()
+            if known_move is not None:
+                return known_move
+            position = self.game.all_piece_objects.copy()
+            position.side_to_move = self.color
+            self.pending_search = AsyncSearch(position, self.time_limit, self.max_depth, self.tt_size_mb, self.workers)
+            return None
+        if not self.pending_search.done():
+            return None
+
+        search, self.pending_search = self.pending_search, None
+        if search.key != self.game.all_piece_objects.key:
+            return None # Board changed while thinking, the result is stale
+        return self._move_from_worker(*search.result())
+
+    def _tablebase_move(self) -> tuple[Piece, tuple[int, int]] | None:
+        """The best move from the endgame tablebases, or None if they don't cover the position."""
+        if not self.use_tablebases:
+            return None
+        position = self.game.all_piece_objects.copy()
+        position.side_to_move = self.color
+        return self._piece_move(self._tablebase_position_move(position))
+
+    def _tablebase_position_move(self, position: Position) -> Move | None:
+        if not self.use_tablebases:
+            return None
+        found = self.game.tablebases.best_move(position)
+        if found is None:
+            return None
+        move, result = found
+        self.last_search_stats = {"tablebase": True, "wdl": result.wdl, "dtm": result.dtm}
+        PROFILER.event("ai_tablebase_move", color=self.color, move=move.uci(), wdl=result.wdl, dtm=result.dtm)
+        return move
+
+    def _book_move(self) -> tuple[Piece, tuple[int, int]] | None:
+        """A move from the opening book for the current position, or None when out of book."""
+        if self.book is None:
+            return None
+        return self._piece_move(self._book_position_move(self.game.all_piece_objects,
+                                                        self.game.input_handler.legal_moves(self.color).moves))
+
+    def _book_position_move(self, position: Position, legal_moves: list[Move]) -> Move | None:
+        if self.book is None:
+            return None
+        start = time.perf_counter()
+        move = self.book.choose_move(position)
+        lookup_time = time.perf_counter() - start
+        if move is None or move not in legal_moves:
+            return None
+        self.last_search_stats = {"book": True, "lookup_us": lookup_time * 1e6}
+        PROFILER.event("ai_book_move", color=self.color, move=move.uci(), lookup_us=round(lookup_time * 1e6, 1))
+        return move
+
+    def _piece_move(self, move: Move | None) -> tuple[Piece, tuple[int, int]] | None:
+        """(live piece, destination) for a Move on the game board."""
+        if move is None:
+            return None
+        piece = self.game.input_handler.get_piece_object_at_coords(*bitboard.square_coords(move.from_sq))
+        return piece, bitboard.square_coords(move.to_sq)
+
+    def _move_from_worker(self, move, stats: dict) -> tuple[Piece, tuple[int, int]] | None:
+        self.last_search_stats = stats
+        if move is None:
+            return None # No legal moves (checkmate or stalemate)
+        if PROFILER.enabled:
+            PROFILER.record("ai_search", stats["elapsed"]) # Engine latency, measured in the worker
+        PROFILER.event("ai_worker_search", color=self.color, depth=stats["depth"], nodes=stats["total_nodes"],
+                       workers=stats["workers"], seconds=round(stats["elapsed"], 3), nps=round(stats["nps"]),
+                       score=stats["score"], tt=stats["tt"])
+        return self._piece_move(move)
+
+    def cancel(self):
+        """Abandons a search running in the worker (e.g. when the board is reset)."""
+        if self.pending_search is not None:
+            self.pending_search.cancel()
+            self.pending_search = None
+
+    @PROFILER.timed("choose_move")
     def choose_move(self) -> tuple[Piece, tuple[int, int]] | None:
         """
-        Chooses a random legal move for the AI.
+        Chooses a legal move for the AI: a random one, or the best one found by
+        the alpha-beta search within the time budget.
         Returns: (piece_to_move, (dest_row, dest_col)) or None if no legal moves.
         """
+        if self.mode == "search":
+            return self._choose_search_move()
+
         # We'll use a method in InputHandler to get all legal moves
         # This keeps the move generation logic centralized
         all_legal_moves = self.game.input_handler.get_all_legal_moves_for_player(self.color)
-        print(f"DEBUG: AI ({self.color}) found {len(all_legal_moves)} legal moves: {[(m[0].piece_type, m[1]) for m in all_legal_moves]}")
+        if PROFILER.debug:
+            PROFILER.event("ai_random_moves", color=self.color, count=len(all_legal_moves),
+                           moves=[(m[0].piece_type, m[1]) for m in all_legal_moves])
 
 
         if not all_legal_moves:
         # It's useful to know if the game should have ended here
-            print(f"DEBUG: AI ({self.color}) has no legal moves. Is king in check? {self.game.input_handler.move_logic.is_king_in_check(self.color, self.game.all_piece_objects, self.game.BOARD_SIZE)}")
+            if PROFILER.debug:
+                PROFILER.event("ai_no_moves", color=self.color, in_check=move_logic.is_king_in_check(
+                    self.color, self.game.all_piece_objects, self.game.BOARD_SIZE))
             return None # No legal moves (checkmate or stalemate)
 
         return random.choice(all_legal_moves)
 
+    def _choose_search_move(self) -> tuple[Piece, tuple[int, int]] | None:
+        known_move = self._tablebase_move() or self._book_move()
+        if known_move is not None:
+            return known_move
+        # Search a sprite-free copy so the live pieces are never touched
+        position = self.game.all_piece_objects.copy()
+        position.side_to_move = self.color
+        if self.workers > 1:
+            search = AsyncSearch(position, self.time_limit, self.max_depth, self.tt_size_mb, self.workers)
+            return self._move_from_worker(*search.wait())
+        return self._piece_move(self._search_position(position))
 
+    def _search_position(self, position: Position) -> Move | None:
+        move = self.searcher.search(position)
+        if move is None:
+            return None # No legal moves (checkmate or stalemate)
+        self.last_search_stats = {"depth": self.searcher.completed_depth, "nodes": self.searcher.nodes,
+                                "elapsed": self.searcher.elapsed, "score": self.searcher.best_score}
+        if PROFILER.debug:
+            PROFILER.event("ai_search", color=self.color, depth=self.searcher.completed_depth, nodes=self.searcher.nodes,
+                           seconds=round(self.searcher.elapsed, 3), score=self.searcher.best_score, tt=self.searcher.tt.stats())
+        return move
+
+    def choose_position_move(self, position: Position, legal_moves: list[Move] | None = None) -> Move | None:
+        """
+        The AI's move for position.side_to_move on a sprite-free Position, for
+        playing without a window (selfplay.py). Same choice as choose_move():
+        tablebase, book, then search, or a random move in "random" mode.
+        Blocks until the search is done. Returns None if there are no legal moves.
+        """
+        if legal_moves is None:
+            legal_moves = bitboard.generate_legal_moves(position)
+        if not legal_moves:
+            return None
+        if self.mode != "search":
+            self.last_search_stats = {"random": True}
+            # Like get_all_legal_moves_for_player(): the AI only promotes to a queen
+            return random.choice([move for move in legal_moves if move.promotion in (None, "queen")])
+        move = self._tablebase_position_move(position) or self._book_position_move(position, legal_moves)
+        if move is not None:
+            return move
+        return self._search_position(position)
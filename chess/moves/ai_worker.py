@@ -0,0 +1,179 @@
+"""
+Runs the AI search in worker processes so the arcade window keeps drawing.
+
+The game sends the position, packed into 38 bytes by moves/encoding.py,
+with the keys of its earlier positions (so the search sees repetitions), to
+a concurrent.futures process pool and polls the returned future every frame. Each search carries
+a generation number; cancel() bumps the shared counter, and a search whose
+generation is out of date stops at its next time check.
+
+With more than one worker the search is a Lazy SMP search: every worker
+searches the same position with its own iterative deepening loop (odd
+helpers start one ply deeper), and all of them share one transposition
+table placed in shared memory, so each worker profits from the others'
+results. The answer is the move of worker 0; helpers are stopped when it
+finishes. Workers publish their node counts in a shared array, which gives
+the total nodes per second.
+
+Run `python -m moves.ai_worker --workers 1 2 4` from the chess folder to
+measure how nodes per second scale with the number of workers.
+"""
+
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, Future
+from multiprocessing import shared_memory
+
+from moves.position import Position, Move, starting_position
+from moves.encoding import pack_position, unpack_position
+from moves.search import Searcher
+from moves.transposition import TranspositionTable, BUCKET_BYTES
+
+_pool: ProcessPoolExecutor | None = None
+_pool_config: tuple[int, float] | None = None # (workers, tt_size_mb) the pool was made for
+_generation = None # Shared multiprocessing.Value, current search generation
+_node_counts = None # Shared multiprocessing.Array, nodes searched per worker
+_tt_memory: shared_memory.SharedMemory | None = None
+
+# Worker process globals
+_worker_generation = None
+_worker_node_counts = None
+_worker_tt_memory: shared_memory.SharedMemory | None = None
+_worker_searcher: Searcher | None = None
+
+
+def _init_worker(generation, node_counts, tt_memory_name: str):
+    global _worker_generation, _worker_node_counts, _worker_tt_memory, _worker_searcher
+    _worker_generation = generation
+    _worker_node_counts = node_counts
+    _worker_tt_memory = shared_memory.SharedMemory(name=tt_memory_name)
+    _worker_searcher = Searcher(tt=TranspositionTable(buffer=_worker_tt_memory.buf))
+
+def _search_task(packed_position: bytes, history: list[int], generation: int, worker_id: int, time_limit: float,
+                max_depth: int) -> tuple:
+    """Runs in a worker. Returns (best move or None, searcher stats). history: keys of the earlier positions."""
+    searcher = _worker_searcher
+    searcher.time_limit = time_limit
+    searcher.max_depth = max_depth
+    searcher.tt.reset_stats()
+
+    def should_stop() -> bool:
+        _worker_node_counts[worker_id] = searcher.nodes
+        return _worker_generation.value != generation
+
+    searcher.should_stop = should_stop
+    position = unpack_position(packed_position)
+    position.set_key_history(history) # So the search sees repetitions of the game's positions
+    move = searcher.search(position, start_depth=1 + worker_id % 2)
+    _worker_node_counts[worker_id] = searcher.nodes
+    stats = {"depth": searcher.completed_depth, "nodes": searcher.nodes, "elapsed": searcher.elapsed,
+            "score": searcher.best_score, "tt": searcher.tt.stats()}
+    return move, stats
+
+
+def _get_pool(workers: int, tt_size_mb: float) -> ProcessPoolExecutor:
+    global _pool, _pool_config, _generation, _node_counts, _tt_memory
+    if _pool is not None and _pool_config != (workers, tt_size_mb):
+        shutdown_pool()
+    if _pool is None:
+        # "spawn" so workers don't inherit the window's OpenGL state through fork()
+        context = multiprocessing.get_context("spawn")
+        _generation = context.Value("i", 0)
+        _node_counts = context.Array("q", workers)
+        tt_bytes = max(1, int(tt_size_mb * 1024 * 1024) // BUCKET_BYTES) * BUCKET_BYTES
+        _tt_memory = shared_memory.SharedMemory(create=True, size=tt_bytes)
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                    initargs=(_generation, _node_counts, _tt_memory.name))
+        _pool_config = (workers, tt_size_mb)
+    return _pool
+
+def shutdown_pool():
+    """Stops any running search and the worker processes."""
+    global _pool, _pool_config, _tt_memory
+    if _pool is not None:
+        with _generation.get_lock():
+            _generation.value += 1
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        _pool_config = None
+    if _tt_memory is not None:
+        _tt_memory.close()
+        _tt_memory.unlink()
+        _tt_memory = None
+
+
+class AsyncSearch:
+    """One search running in the worker pool, started from a Position."""
+
+    def __init__(self, position: Position, time_limit: float, max_depth: int, tt_size_mb: float, workers: int = 1):
+        pool = _get_pool(workers, tt_size_mb)
+        with _generation.get_lock():
+            _generation.value += 1
+            self.generation = _generation.value
+        for worker_id in range(workers):
+            _node_counts[worker_id] = 0
+        self.workers = workers
+        self.key = position.key # Lets the caller check that the board hasn't changed meanwhile
+        self.started = time.perf_counter()
+        packed_position = pack_position(position)
+        history = position.reversible_history()
+        self.futures: list[Future] = [pool.submit(_search_task, packed_position, history, self.generation, worker_id,
+                                                time_limit, max_depth)
+                                    for worker_id in range(workers)]
+
+    def done(self) -> bool:
+        return self.futures[0].done()
+
+    def result(self) -> tuple[Move | None, dict]:
+        """
+        (best move or None, stats) from worker 0; helpers are told to stop.
+        stats gains "workers", "total_nodes" and "nps" (all workers together).
+        """
+        move, stats = self.futures[0].result()
+        self._stop_helpers()
+        elapsed = max(stats["elapsed"], 1e-9)
+        total_nodes = sum(_node_counts[:self.workers])
+        stats.update(workers=self.workers, total_nodes=total_nodes, nps=total_nodes / elapsed)
+        return move, stats
+
+    def wait(self) -> tuple[Move | None, dict]:
+        """Blocks until worker 0 is done and returns result()."""
+        self.futures[0].result()
+        return self.result()
+
+    def _stop_helpers(self):
+        if _generation.value == self.generation:
+            with _generation.get_lock():
+                _generation.value += 1
+
+    def cancel(self):
+        """Stops the search; its result should be ignored."""
+        for future in self.futures:
+            future.cancel()
+        self._stop_helpers()
+
+
+def measure_scaling(worker_counts, time_limit: float = 2.0, max_depth: int = 64, tt_size_mb: float = 64) -> dict[int, float]:
+    """Searches the starting position with each worker count; returns {workers: nodes per second}."""
+    results = {}
+    for workers in worker_counts:
+        search = AsyncSearch(starting_position(), time_limit, max_depth, tt_size_mb, workers)
+        _, stats = search.wait()
+        results[workers] = stats["nps"]
+        shutdown_pool() # Fresh table for the next run
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure nodes-per-second scaling of the parallel search.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--time", type=float, default=2.0, help="Seconds per search")
+    args = parser.parse_args()
+    results = measure_scaling(args.workers, args.time)
+    base = results[args.workers[0]]
+    print(f"{'workers':>8} {'nodes/s':>12} {'scaling':>8}")
+    for workers, nps in results.items():
+        print(f"{workers:>8} {nps:>12.0f} {nps / base:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
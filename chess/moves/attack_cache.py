@@ -0,0 +1,67 @@
+"""
+Attack maps memoized per position.
+
+The renderer asks "is the side to move in check?" on every frame, to
+highlight the king, while the position only changes once per move. The
+attack map of a color (a mask of every square its pieces attack) is
+computed once per position and kept in a small LRU cache keyed by the
+position's Zobrist key, so the later queries are a dictionary lookup and a
+bit test. Attacks only depend on the pieces, so the side to move, castling
+and en-passant parts are taken out of the key: the position before and
+after the turn switch share one entry. The search doesn't use this cache;
+it visits each position too briefly to profit. Nor does the input handler:
+the notation and mate detection take the checking pieces from the legal
+moves it already generates once per turn.
+"""
+
+from collections import OrderedDict
+
+from moves import bitboard, zobrist
+from moves.position import Position, BLACK, opponent
+
+
+def pieces_key(position: Position) -> int:
+    """The position's Zobrist key with only the piece placement left in."""
+    key = position.key ^ zobrist.castling_key(position.castling_rights) ^ zobrist.ep_key(position.ep_square)
+    return key ^ zobrist.SIDE_KEY if position.side_to_move == BLACK else key
+
+
+class AttackMapCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._maps: OrderedDict[tuple[int, str], int] = OrderedDict() # (key, color) -> attacked squares
+        self.hits = 0
+        self.misses = 0
+
+    def attack_map(self, position: Position, color: str) -> int:
+        """Mask of the squares color's pieces attack in position."""
+        cache_key = (pieces_key(position), color)
+        attacks = self._maps.get(cache_key)
+        if attacks is not None:
+            self._maps.move_to_end(cache_key)
+            self.hits += 1
+            return attacks
+        self.misses += 1
+        attacks = bitboard.attack_map(position, color)
+        self._maps[cache_key] = attacks
+        if len(self._maps) > self.max_entries:
+            self._maps.popitem(last=False) # Least recently used
+        return attacks
+
+    def is_square_attacked(self, position: Position, sq: int, attacker_color: str) -> bool:
+        return bool(self.attack_map(position, attacker_color) >> sq & 1)
+
+    def is_king_in_check(self, position: Position, king_color: str) -> bool:
+        king_mask = position.bitboards[king_color]["king"]
+        return bool(king_mask and self.attack_map(position, opponent(king_color)) & king_mask)
+
+    def clear(self):
+        self._maps.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"entries": len(self._maps), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+ATTACK_CACHE = AttackMapCache() # Used by the renderer's check highlight and move_logic's check queries
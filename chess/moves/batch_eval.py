@@ -0,0 +1,105 @@
+"""
+NumPy batch evaluation of many positions at once, for training data and analysis.
+
+Positions come in as a (N, PACKED_SIZE) uint8 array of pack_position() bytes
+(moves/encoding.py). The 4-bit square codes are unpacked to a (N, 64) array
+and looked up in code-by-square tables built from moves/evaluation.py, so the
+scores match evaluation.evaluate() exactly. NumPy is only needed for this
+module, not for the game.
+
+Benchmark evaluations per second from the chess folder:
+    python -m moves.batch_eval --positions 20000
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from moves import bitboard, evaluation
+from moves.encoding import pack_position, PIECE_CODES, BLACK_FLAG, BOARD_BYTES
+from moves.position import Position, starting_position
+
+# Tables indexed [code, square]; code 0 (empty) and unused codes score 0
+_MIDDLEGAME = np.zeros((16, 64), dtype=np.int64)
+_ENDGAME = np.zeros((16, 64), dtype=np.int64)
+_PHASE = np.zeros(16, dtype=np.int64)
+for (_color, _piece_type), _values in evaluation.PSQ_MIDDLEGAME.items():
+    _code = PIECE_CODES[_piece_type] + (BLACK_FLAG if _color == "black" else 0)
+    _MIDDLEGAME[_code] = _values
+    _ENDGAME[_code] = evaluation.PSQ_ENDGAME[(_color, _piece_type)]
+    _PHASE[_code] = evaluation.PHASE_WEIGHTS[_piece_type]
+_SQUARES = np.arange(64)
+
+
+def pack_batch(positions: list[Position]) -> np.ndarray:
+    """Packs positions into a (N, PACKED_SIZE) uint8 array."""
+    return np.frombuffer(b"".join(pack_position(position) for position in positions),
+                        dtype=np.uint8).reshape(len(positions), -1)
+
+def unpack_codes(packed: np.ndarray) -> np.ndarray:
+    """(N, 64) array of square codes (a1 first) from packed boards."""
+    board = packed[:, :BOARD_BYTES]
+    codes = np.empty((len(packed), 64), dtype=np.uint8)
+    codes[:, 0::2] = board & 15
+    codes[:, 1::2] = board >> 4
+    return codes
+
+def evaluate_batch(packed: np.ndarray) -> np.ndarray:
+    """Scores in centipawns from each side to move's point of view, like evaluation.evaluate()."""
+    codes = unpack_codes(packed)
+    middlegame = _MIDDLEGAME[codes, _SQUARES].sum(axis=1)
+    endgame = _ENDGAME[codes, _SQUARES].sum(axis=1)
+    phase = np.minimum(_PHASE[codes].sum(axis=1), evaluation.MAX_PHASE)
+    scores = (middlegame * phase + endgame * (evaluation.MAX_PHASE - phase)) // evaluation.MAX_PHASE
+    black_to_move = (packed[:, BOARD_BYTES] & 1).astype(bool)
+    return np.where(black_to_move, -scores, scores)
+
+
+def random_positions(count: int, max_plies: int = 60, seed: int = 0) -> list[Position]:
+    """Positions from random games, for benchmarks."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        position = starting_position()
+        for _ in range(rng.randrange(max_plies)):
+            moves = bitboard.generate_legal_moves(position)
+            if not moves:
+                break
+            position.make_move(rng.choice(moves))
+        positions.append(position)
+    return positions
+
+def benchmark(count: int = 20000) -> dict[str, float]:
+    """Evaluations per second: incremental, summed over the pieces, and NumPy batch."""
+    positions = random_positions(count)
+    packed = pack_batch(positions)
+    results = {}
+
+    start = time.perf_counter()
+    incremental = [evaluation.evaluate(position) for position in positions]
+    results["incremental"] = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    from_scratch = [evaluation.evaluate_from_scratch(position) for position in positions]
+    results["from_scratch"] = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    batch = evaluate_batch(packed)
+    results["batch"] = count / (time.perf_counter() - start)
+
+    if not (incremental == from_scratch == batch.tolist()):
+        raise AssertionError("Evaluation modes disagree")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the static evaluation in evaluations per second.")
+    parser.add_argument("--positions", type=int, default=20000)
+    args = parser.parse_args()
+    results = benchmark(args.positions)
+    for name, rate in results.items():
+        print(f"{name:>13}: {rate:>12.0f} evals/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Bitboard move generation.
+
+Squares are numbered row * 8 + col (a1 = 0, h1 = 7, a8 = 56), matching the
+occupancy masks that Position keeps per color and piece type. Knight, king
+and pawn attacks come from precomputed tables; sliding pieces use classical
+ray tables, cut at the first blocker found with a bit scan.
+"""
+
+from moves.position import Position, Move, WHITE, BLACK, opponent, CASTLING_ROOK_SQUARES
+
+BOARD_SIZE = 8
+PROMOTION_TYPES = ("queen", "rook", "bishop", "knight")
+
+
+def square_index(row: int, col: int) -> int:
+    return row * BOARD_SIZE + col
+
+def square_coords(sq: int) -> tuple[int, int]:
+    """Returns (row, col) for a square index."""
+    return divmod(sq, BOARD_SIZE)
+
+def iter_bits(bitboard: int):
+    """Yields the square index of every set bit, lowest first."""
+    while bitboard:
+        lowest = bitboard & -bitboard
+        yield lowest.bit_length() - 1
+        bitboard ^= lowest
+
+
+def _build_leaper_table(offsets) -> list[int]:
+    table = []
+    for sq in range(64):
+        row, col = square_coords(sq)
+        mask = 0
+        for d_row, d_col in offsets:
+            r, c = row + d_row, col + d_col
+            if 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE:
+                mask |= 1 << square_index(r, c)
+        table.append(mask)
+    return table
+
+def _build_ray_table(d_row: int, d_col: int) -> list[int]:
+    table = []
+    for sq in range(64):
+        row, col = square_coords(sq)
+        mask = 0
+        r, c = row + d_row, col + d_col
+        while 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE:
+            mask |= 1 << square_index(r, c)
+            r += d_row
+            c += d_col
+        table.append(mask)
+    return table
+
+KNIGHT_ATTACKS = _build_leaper_table(((1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)))
+KING_ATTACKS = _build_leaper_table(((1, -1), (1, 0), (1, 1), (0, -1), (0, 1), (-1, -1), (-1, 0), (-1, 1)))
+# Squares a pawn of the given color standing on sq attacks
+PAWN_ATTACKS = {
+    WHITE: _build_leaper_table(((1, -1), (1, 1))),
+    BLACK: _build_leaper_table(((-1, -1), (-1, 1))),
+}
+
+# (ray table, True if the ray runs towards higher square indices)
+ROOK_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+BISHOP_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+ROOK_RAYS = [(_build_ray_table(dr, dc), dr * BOARD_SIZE + dc > 0) for dr, dc in ROOK_DIRECTIONS]
+BISHOP_RAYS = [(_build_ray_table(dr, dc), dr * BOARD_SIZE + dc > 0) for dr, dc in BISHOP_DIRECTIONS]
+
+RANK_MASKS = [0xFF << (BOARD_SIZE * row) for row in range(BOARD_SIZE)]
+PAWN_START_RANK = {WHITE: RANK_MASKS[1], BLACK: RANK_MASKS[6]}
+PROMOTION_RANK = {WHITE: RANK_MASKS[7], BLACK: RANK_MASKS[0]}
+PAWN_PUSH = {WHITE: BOARD_SIZE, BLACK: -BOARD_SIZE}
+EP_RANK = {WHITE: RANK_MASKS[5], BLACK: RANK_MASKS[2]} # Where color's pawns capture en passant
+
+def _squares(*squares) -> int:
+    mask = 0
+    for sq in squares:
+        mask |= 1 << sq
+    return mask
+
+# (right, king from, king to, squares that must be empty, squares the king crosses that must not be attacked)
+CASTLINGS = {
+    WHITE: (("K", 4, 6, _squares(5, 6), _squares(5, 6)),
+            ("Q", 4, 2, _squares(1, 2, 3), _squares(2, 3))),
+    BLACK: (("k", 60, 62, _squares(61, 62), _squares(61, 62)),
+            ("q", 60, 58, _squares(57, 58, 59), _squares(58, 59))),
+}
+
+
+def _slider_attacks(sq: int, occupancy: int, rays) -> int:
+    attacks = 0
+    for table, positive in rays:
+        ray = table[sq]
+        blockers = ray & occupancy
+        if blockers:
+            if positive:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            ray ^= table[first] # Drop the squares behind the first blocker
+        attacks |= ray
+    return attacks
+
+def rook_attacks(sq: int, occupancy: int) -> int:
+    return _slider_attacks(sq, occupancy, ROOK_RAYS)
+
+def bishop_attacks(sq: int, occupancy: int) -> int:
+    return _slider_attacks(sq, occupancy, BISHOP_RAYS)
+
+
+def _is_attacked(position: Position, sq: int, attacker_color: str, occupancy: int, removed: int = 0) -> bool:
+    """
+    Checks if sq is attacked by attacker_color given an occupancy mask.
+    Attackers on the squares in `removed` are ignored (e.g. a piece that was just captured).
+    """
+    bb = position.bitboards[attacker_color]
+    keep = ~removed
+    if PAWN_ATTACKS[opponent(attacker_color)][sq] & bb["pawn"] & keep:
+        return True
+    if KNIGHT_ATTACKS[sq] & bb["knight"] & keep:
+        return True
+    if KING_ATTACKS[sq] & bb["king"] & keep:
+        return True
+    straight = (bb["rook"] | bb["queen"]) & keep
+    if straight and rook_attacks(sq, occupancy) & straight:
+        return True
+    diagonal = (bb["bishop"] | bb["queen"]) & keep
+    if diagonal and bishop_attacks(sq, occupancy) & diagonal:
+        return True
+    return False
+
+def is_square_attacked(position: Position, sq: int, attacker_color: str) -> bool:
+    """Checks if square index sq is attacked by any piece of attacker_color."""
+    occupancy = position.occupied[WHITE] | position.occupied[BLACK]
+    return _is_attacked(position, sq, attacker_color, occupancy)
+
+def is_king_in_check(position: Position, king_color: str) -> bool:
+    king_bb = position.bitboards[king_color]["king"]
+    if not king_bb:
+        return False # Should not happen
+    return is_square_attacked(position, king_bb.bit_length() - 1, opponent(king_color))
+
+
+def attack_map(position: Position, color: str, occupancy: int | None = None) -> int:
+    """Mask of every square attacked by color's pieces for the given occupancy."""
+    if occupancy is None:
+        occupancy = position.occupied[WHITE] | position.occupied[BLACK]
+    bb = position.bitboards[color]
+    attacks = 0
+    pawn_attacks = PAWN_ATTACKS[color]
+    for sq in iter_bits(bb["pawn"]):
+        attacks |= pawn_attacks[sq]
+    for sq in iter_bits(bb["knight"]):
+        attacks |= KNIGHT_ATTACKS[sq]
+    for sq in iter_bits(bb["bishop"] | bb["queen"]):
+        attacks |= bishop_attacks(sq, occupancy)
+    for sq in iter_bits(bb["rook"] | bb["queen"]):
+        attacks |= rook_attacks(sq, occupancy)
+    for sq in iter_bits(bb["king"]):
+        attacks |= KING_ATTACKS[sq]
+    return attacks
+
+def attackers_to(position: Position, sq: int, attacker_color: str, occupancy: int) -> int:
+    """Mask of attacker_color's pieces that attack sq."""
+    bb = position.bitboards[attacker_color]
+    return ((PAWN_ATTACKS[opponent(attacker_color)][sq] & bb["pawn"])
+            | (KNIGHT_ATTACKS[sq] & bb["knight"])
+            | (KING_ATTACKS[sq] & bb["king"])
+            | (rook_attacks(sq, occupancy) & (bb["rook"] | bb["queen"]))
+            | (bishop_attacks(sq, occupancy) & (bb["bishop"] | bb["queen"])))
+
+
+def _build_between_table() -> list[list[int]]:
+    """BETWEEN[a][b]: squares strictly between a and b if they share a line, else 0."""
+    table = [[0] * 64 for _ in range(64)]
+    for a in range(64):
+        row, col = square_coords(a)
+        for d_row, d_col in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            path = 0
+            r, c = row + d_row, col + d_col
+            while 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE:
+                b = square_index(r, c)
+                table[a][b] = path
+                path |= 1 << b
+                r += d_row
+                c += d_col
+    return table
+
+BETWEEN = _build_between_table()
+
+
+def _pins(position: Position, color: str, king_sq: int, occupancy: int) -> dict[int, int]:
+    """
+    Finds color's pieces pinned to its king.
+    Returns {pinned square: mask of squares it may still move to (along the pin)}.
+    """
+    own = position.occupied[color]
+    enemy_bb = position.bitboards[opponent(color)]
+    pins = {}
+    enemy_only = occupancy & ~own # Look through own pieces to find the pinners
+    for rays, sliders in ((ROOK_RAYS, enemy_bb["rook"] | enemy_bb["queen"]),
+                        (BISHOP_RAYS, enemy_bb["bishop"] | enemy_bb["queen"])):
+        if not sliders:
+            continue
+        for pinner_sq in iter_bits(_slider_attacks(king_sq, enemy_only, rays) & sliders):
+            between = BETWEEN[king_sq][pinner_sq] & occupancy
+            if between and between & (between - 1) == 0 and between & own:
+                pins[between.bit_length() - 1] = BETWEEN[king_sq][pinner_sq] | (1 << pinner_sq)
+    return pins
+
+
+def _generate(position: Position, color: str, target_mask: int, pins: dict[int, int], king_targets: int) -> list[Move]:
+    """
+    Emits moves for color. Non-king pieces may only land on target_mask (and
+    along their pin ray if pinned); the king only on king_targets.
+    """
+    moves = []
+    bb = position.bitboards[color]
+    own = position.occupied[color]
+    enemy = position.occupied[opponent(color)]
+    occupancy = own | enemy
+    empty = ~occupancy
+    target_mask &= ~own
+
+    # Pawns
+    push = PAWN_PUSH[color]
+    promotion_rank = PROMOTION_RANK[color]
+    pawn_attacks = PAWN_ATTACKS[color]
+    for from_sq in iter_bits(bb["pawn"]):
+        targets = pawn_attacks[from_sq] & enemy
+        one_step = from_sq + push
+        if 0 <= one_step < 64 and (1 << one_step) & empty:
+            targets |= 1 << one_step
+            two_step = one_step + push
+            if (1 << from_sq) & PAWN_START_RANK[color] and (1 << two_step) & empty:
+                targets |= 1 << two_step
+        targets &= target_mask & pins.get(from_sq, -1)
+        for to_sq in iter_bits(targets):
+            if (1 << to_sq) & promotion_rank:
+                for promotion in PROMOTION_TYPES:
+                    moves.append(Move(from_sq, to_sq, promotion))
+            else:
+                moves.append(Move(from_sq, to_sq))
+
+    # Pieces
+    for from_sq in iter_bits(bb["knight"]):
+        if from_sq in pins:
+            continue # A pinned knight can never move
+        for to_sq in iter_bits(KNIGHT_ATTACKS[from_sq] & target_mask):
+            moves.append(Move(from_sq, to_sq))
+    for from_sq in iter_bits(bb["bishop"]):
+        for to_sq in iter_bits(bishop_attacks(from_sq, occupancy) & target_mask & pins.get(from_sq, -1)):
+            moves.append(Move(from_sq, to_sq))
+    for from_sq in iter_bits(bb["rook"]):
+        for to_sq in iter_bits(rook_attacks(from_sq, occupancy) & target_mask & pins.get(from_sq, -1)):
+            moves.append(Move(from_sq, to_sq))
+    for from_sq in iter_bits(bb["queen"]):
+        attacks = rook_attacks(from_sq, occupancy) | bishop_attacks(from_sq, occupancy)
+        for to_sq in iter_bits(attacks & target_mask & pins.get(from_sq, -1)):
+            moves.append(Move(from_sq, to_sq))
+    for from_sq in iter_bits(bb["king"]):
+        for to_sq in iter_bits(KING_ATTACKS[from_sq] & king_targets & ~own):
+            moves.append(Move(from_sq, to_sq))
+    return moves
+
+def _castling_moves(position: Position, color: str, occupancy: int, safe: int) -> list[Move]:
+    """
+    Castling moves of color whose right is kept, king and rook are in place and
+    the squares between them are empty. The king may only cross squares in
+    safe; the caller makes sure it isn't in check.
+    """
+    moves = []
+    if not position.castling_rights:
+        return moves
+    bb = position.bitboards[color]
+    for right, king_from, king_to, empty, path in CASTLINGS[color]:
+        rook_from = CASTLING_ROOK_SQUARES[king_to][0]
+        if right in position.castling_rights and bb["king"] >> king_from & 1 and bb["rook"] >> rook_from & 1 \
+                and not occupancy & empty and path & safe == path:
+            moves.append(Move(king_from, king_to))
+    return moves
+
+def _en_passant_moves(position: Position, color: str, occupancy: int, king_sq: int | None) -> list[Move]:
+    """
+    En-passant captures of color. With king_sq, only those that don't leave the
+    king in check: both pawns leave their squares at once (which can uncover a
+    rook along the rank), so the attack test is redone on the new occupancy.
+    """
+    moves = []
+    ep_square = position.ep_square
+    if ep_square is None or not (1 << ep_square) & EP_RANK[color]:
+        return moves
+    enemy = opponent(color)
+    captured_sq = ep_square - PAWN_PUSH[color]
+    if not position.bitboards[enemy]["pawn"] >> captured_sq & 1:
+        return moves
+    for from_sq in iter_bits(PAWN_ATTACKS[enemy][ep_square] & position.bitboards[color]["pawn"]):
+        if king_sq is not None:
+            after = (occupancy ^ (1 << from_sq) ^ (1 << captured_sq)) | (1 << ep_square)
+            if _is_attacked(position, king_sq, enemy, after, removed=1 << captured_sq):
+                continue
+        moves.append(Move(from_sq, ep_square))
+    return moves
+
+def generate_pseudo_legal_moves(position: Position, color: str) -> list[Move]:
+    """Moves that follow each piece's movement rules, ignoring whether the own king is left in check."""
+    occupancy = position.occupied[WHITE] | position.occupied[BLACK]
+    return (_generate(position, color, -1, {}, -1) + _castling_moves(position, color, occupancy, -1)
+            + _en_passant_moves(position, color, occupancy, None))
+
+def legal_moves_and_checkers(position: Position, color: str | None = None) -> tuple[list[Move], int]:
+    """
+    All legal moves for color (defaults to position.side_to_move) plus the mask
+    of enemy pieces giving check, from one pass over the position: checkers and
+    pins are computed once, instead of testing every move for self-check.
+    """
+    color = color or position.side_to_move
+    king_bb = position.bitboards[color]["king"]
+    if not king_bb:
+        return generate_pseudo_legal_moves(position, color), 0
+    king_sq = king_bb.bit_length() - 1
+    enemy = opponent(color)
+    occupancy = position.occupied[WHITE] | position.occupied[BLACK]
+
+    # The king may not step onto an attacked square, including squares behind
+    # it on a checking ray, so the enemy attack map is built without our king.
+    king_targets = ~attack_map(position, enemy, occupancy & ~king_bb)
+    checkers = attackers_to(position, king_sq, enemy, occupancy)
+    if checkers & (checkers - 1):
+        return _generate(position, color, 0, {}, king_targets), checkers # Double check: king moves only
+    if checkers:
+        checker_sq = checkers.bit_length() - 1
+        target_mask = checkers | BETWEEN[king_sq][checker_sq] # Capture the checker or block
+    else:
+        target_mask = -1
+    pins = _pins(position, color, king_sq, occupancy)
+    moves = _generate(position, color, target_mask, pins, king_targets)
+    if position.ep_square is not None:
+        moves += _en_passant_moves(position, color, occupancy, king_sq)
+    if not checkers:
+        moves += _castling_moves(position, color, occupancy, king_targets)
+    return moves, checkers
+
+def generate_legal_moves(position: Position, color: str | None = None) -> list[Move]:
+    """All legal moves for color (defaults to position.side_to_move)."""
+    return legal_moves_and_checkers(position, color)[0]
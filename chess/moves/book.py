@@ -0,0 +1,208 @@
+"""
+Opening book read straight from a memory-mapped file.
+
+The book file is a short header followed by fixed-size records
+(Zobrist key, move, weight), sorted by key. A lookup is a binary search
+over the mapped bytes, so opening a book parses nothing, and every process
+that opens the same file shares the operating system's cached pages.
+
+Build a book from PGN games (.pgn, .pgn.gz or .pgn.bz2) or plain SAN move
+lists (one game per line), and measure lookup latency, from the chess folder:
+    python -m moves.book build data/openings.txt data/book.bin --plies 16
+    python -m moves.book stats data/book.bin
+"""
+
+import argparse
+import itertools
+import mmap
+import os
+import random
+import re
+import struct
+import time
+from typing import Iterable, Iterator
+
+from moves import pgn
+from moves.position import Position, Move
+from moves.fen import parse_fen, START_FEN
+from moves.san import parse_san, SanError
+
+BOOK_MAGIC = b"CHBOOK01"
+_RECORD = struct.Struct("<QHH") # key, packed move, weight
+RECORD_SIZE = _RECORD.size
+_PROMOTIONS = (None, "queen", "rook", "bishop", "knight")
+MAX_WEIGHT = 0xFFFF
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+DEFAULT_SOURCE = os.path.join(DATA_DIR, "openings.txt")
+DEFAULT_BOOK = os.path.join(DATA_DIR, "book.bin")
+
+
+def _pack_move(move: Move) -> int:
+    return move.from_sq | (move.to_sq << 6) | (_PROMOTIONS.index(move.promotion) << 12)
+
+def _unpack_move(packed: int) -> Move:
+    return Move(packed & 63, (packed >> 6) & 63, _PROMOTIONS[packed >> 12])
+
+
+class OpeningBook:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(BOOK_MAGIC)] != BOOK_MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not an opening book")
+        self.num_records = (len(self._map) - len(BOOK_MAGIC)) // RECORD_SIZE
+
+    def close(self):
+        self._map.close()
+
+    def _key_at(self, index: int) -> int:
+        return struct.unpack_from("<Q", self._map, len(BOOK_MAGIC) + index * RECORD_SIZE)[0]
+
+    def lookup(self, key: int) -> list[tuple[Move, int]]:
+        """All (move, weight) entries for a Zobrist key, heaviest first."""
+        low, high = 0, self.num_records
+        while low < high: # First record with a key >= key
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        offset = len(BOOK_MAGIC) + low * RECORD_SIZE
+        while low < self.num_records:
+            record_key, packed_move, weight = _RECORD.unpack_from(self._map, offset)
+            if record_key != key:
+                break
+            entries.append((_unpack_move(packed_move), weight))
+            low += 1
+            offset += RECORD_SIZE
+        return entries
+
+    def probe(self, position: Position) -> list[tuple[Move, int]]:
+        return self.lookup(position.key)
+
+    def choose_move(self, position: Position, rng: random.Random | None = None) -> Move | None:
+        """A book move picked at random in proportion to its weight, or None when out of book."""
+        entries = self.probe(position)
+        if not entries:
+            return None
+        moves, weights = zip(*entries)
+        return (rng or random).choices(moves, weights=weights)[0]
+
+
+def read_games(lines: Iterable[str]) -> Iterator[list[str]]:
+    """
+    SAN move lists from PGN (read by moves/pgn.py), or from plain lines of SAN
+    moves (one game per line, no move numbers). The first non-blank line tells
+    which: PGN starts with a tag pair or a move number.
+    """
+    lines = iter(lines)
+    first_lines = []
+    for line in lines:
+        first_lines.append(line)
+        if line.strip():
+            break
+    lines = itertools.chain(first_lines, lines)
+    first = first_lines[-1].strip() if first_lines else ""
+    if first.startswith("[") or re.match(r"\d+\.", first):
+        for game in pgn.iter_games(lines):
+            yield game.sans
+    else:
+        for line in lines:
+            if line.strip():
+                yield line.split()
+
+
+def build_book(games: Iterable[list[str]], max_plies: int = 16, start_fen: str = START_FEN) -> dict[tuple[int, int], int]:
+    """
+    Counts how often each move was played from each position in the first max_plies.
+    Returns {(key, packed move): weight}. A game is cut off at its first move that
+    can't be read or isn't legal here.
+    """
+    counts: dict[tuple[int, int], int] = {}
+    position = parse_fen(start_fen)
+    for sans in games:
+        played = 0
+        for san in sans[:max_plies]:
+            try:
+                move = parse_san(position, san)
+            except SanError:
+                break
+            entry = (position.key, _pack_move(move))
+            counts[entry] = min(counts.get(entry, 0) + 1, MAX_WEIGHT)
+            position.make_move(move)
+            played += 1
+        for _ in range(played):
+            position.unmake_move()
+    return counts
+
+def write_book(counts: dict[tuple[int, int], int], path: str):
+    """Writes the records sorted by key (heaviest move first within a key)."""
+    records = sorted(((key, move, weight) for (key, move), weight in counts.items()),
+                    key=lambda record: (record[0], -record[2], record[1]))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(BOOK_MAGIC)
+        for record in records:
+            file.write(_RECORD.pack(*record))
+    os.replace(temp_path, path) # Readers never see a half-written book
+
+def compile_book(source_path: str, book_path: str, max_plies: int = 16) -> int:
+    """Builds book_path from a PGN / SAN list file (read as a stream). Returns the number of records."""
+    with pgn.open_pgn(source_path) as file:
+        counts = build_book(read_games(file), max_plies)
+    write_book(counts, book_path)
+    return len(counts)
+
+def open_default_book() -> OpeningBook | None:
+    """The book shipped in data/, compiled from data/openings.txt when missing or out of date."""
+    if not os.path.exists(DEFAULT_SOURCE):
+        return None
+    if not os.path.exists(DEFAULT_BOOK) or os.path.getmtime(DEFAULT_BOOK) < os.path.getmtime(DEFAULT_SOURCE):
+        compile_book(DEFAULT_SOURCE, DEFAULT_BOOK)
+    return OpeningBook(DEFAULT_BOOK)
+
+
+def measure_latency(book: OpeningBook, lookups: int = 100000) -> dict:
+    """Times lookups of keys in the book and of random keys (misses). Returns microseconds per lookup."""
+    rng = random.Random(0)
+    hit_keys = [book._key_at(rng.randrange(book.num_records)) for _ in range(1000)] if book.num_records else [0]
+    miss_keys = [rng.getrandbits(64) for _ in range(1000)]
+    results = {"records": book.num_records}
+    for name, keys in (("hit_us", hit_keys), ("miss_us", miss_keys)):
+        start = time.perf_counter()
+        for index in range(lookups):
+            book.lookup(keys[index % len(keys)])
+        results[name] = (time.perf_counter() - start) / lookups * 1e6
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an opening book or measure its lookup speed.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Compile a PGN or SAN move list file into a book")
+    build.add_argument("source")
+    build.add_argument("book")
+    build.add_argument("--plies", type=int, default=16, help="Book moves per game")
+    stats = commands.add_parser("stats", help="Report record count and lookup latency")
+    stats.add_argument("book")
+    stats.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        records = compile_book(args.source, args.book, args.plies)
+        print(f"Wrote {records} records to {args.book} in {time.perf_counter() - start:.2f}s")
+    else:
+        book = OpeningBook(args.book)
+        results = measure_latency(book, args.lookups)
+        book.close()
+        print(f"Records: {results['records']}")
+        print(f"Lookup (hit):  {results['hit_us']:.2f} us")
+        print(f"Lookup (miss): {results['miss_us']:.2f} us")
+
+if __name__ == "__main__":
+    main()
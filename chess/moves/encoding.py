@@ -0,0 +1,70 @@
+"""
+Compact fixed-size binary encoding of a position.
+
+Used to send positions to worker processes and to store them in caches and
+files without pickling Piece objects (which carry arcade sprites). Layout,
+PACKED_SIZE = 38 bytes:
+
+    32 bytes  board, one 4-bit code per square (a1 = low nibble of byte 0,
+              b1 = high nibble, ... h8 = high nibble of byte 31).
+              0 = empty, 1-6 = white pawn..king, 9-14 = black pawn..king
+     1 byte   flags: bit 0 = black to move, bits 1-4 = castling K, Q, k, q
+     1 byte   en-passant square index, 255 if none
+     2 bytes  halfmove clock (little endian)
+     2 bytes  fullmove number (little endian)
+"""
+
+import struct
+
+from moves.position import Position, PieceState, WHITE, BLACK
+
+PIECE_CODES = {"pawn": 1, "knight": 2, "bishop": 3, "rook": 4, "queen": 5, "king": 6}
+CODE_PIECES = {code: piece_type for piece_type, code in PIECE_CODES.items()}
+BLACK_FLAG = 8 # Added to the piece code for black pieces
+CASTLING_ORDER = "KQkq"
+NO_EP_SQUARE = 255
+
+_FLAGS_FORMAT = struct.Struct("<BBHH")
+BOARD_BYTES = 32
+PACKED_SIZE = BOARD_BYTES + _FLAGS_FORMAT.size
+
+
+def pack_position(position: Position) -> bytes:
+    """Encodes an 8x8 Position into PACKED_SIZE bytes."""
+    if position.board_size != 8:
+        raise ValueError("Only 8x8 positions can be packed")
+    board = bytearray(BOARD_BYTES)
+    for piece in position:
+        sq = int(piece.row) * 8 + int(piece.col)
+        code = PIECE_CODES[piece.piece_type] + (BLACK_FLAG if piece.color == BLACK else 0)
+        board[sq >> 1] |= code << (4 * (sq & 1))
+
+    flags = 1 if position.side_to_move == BLACK else 0
+    for bit, right in enumerate(CASTLING_ORDER):
+        if right in position.castling_rights:
+            flags |= 2 << bit
+    ep = NO_EP_SQUARE if position.ep_square is None else position.ep_square
+    return bytes(board) + _FLAGS_FORMAT.pack(flags, ep, position.halfmove_clock, position.fullmove_number)
+
+def unpack_position(data: bytes) -> Position:
+    """Decodes bytes made by pack_position() into a sprite-free Position."""
+    if len(data) != PACKED_SIZE:
+        raise ValueError(f"Packed position must be {PACKED_SIZE} bytes, got {len(data)}")
+    pieces = []
+    for index in range(BOARD_BYTES):
+        byte = data[index]
+        for half in (0, 1):
+            code = (byte >> (4 * half)) & 15
+            if code:
+                row, col = divmod(2 * index + half, 8)
+                color = BLACK if code & BLACK_FLAG else WHITE
+                pieces.append(PieceState(CODE_PIECES[code & 7], color, row, col))
+
+    flags, ep, halfmove_clock, fullmove_number = _FLAGS_FORMAT.unpack_from(data, BOARD_BYTES)
+    position = Position(pieces, side_to_move=BLACK if flags & 1 else WHITE)
+    position.castling_rights = "".join(right for bit, right in enumerate(CASTLING_ORDER) if flags & (2 << bit))
+    if ep != NO_EP_SQUARE:
+        position.ep_square = ep
+    position.halfmove_clock = halfmove_clock
+    position.fullmove_number = fullmove_number
+    return position
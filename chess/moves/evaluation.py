@@ -0,0 +1,129 @@
+"""
+Static evaluation: material plus piece-square tables.
+
+Every (piece, square) pair has a value: the piece's material plus a bonus
+or penalty for standing on that square (knights in the centre, pawns
+advanced, the king sheltered in the middlegame but active in the endgame).
+Position keeps the sum of these values up to date as pieces are added,
+removed and moved, like its Zobrist key, so evaluate() costs a few
+arithmetic operations instead of a loop over the board. Middlegame and
+endgame sums are kept separately and blended by how much material is left
+(the game phase).
+
+The tables are the "simplified evaluation function" ones, written from
+white's point of view with the 8th rank on top; black uses them mirrored.
+"""
+
+# Same values as moves.position.WHITE/BLACK/PIECE_TYPES (position imports this module)
+COLORS = ("white", "black")
+PIECE_TYPES = ("pawn", "knight", "bishop", "rook", "queen", "king")
+
+PIECE_VALUES = {"pawn": 100, "knight": 320, "bishop": 330, "rook": 500, "queen": 900, "king": 0}
+PHASE_WEIGHTS = {"pawn": 0, "knight": 1, "bishop": 1, "rook": 2, "queen": 4, "king": 0}
+MAX_PHASE = 24 # All pieces on the board: pure middlegame
+
+_TABLES = {
+    "pawn": (
+         0,  0,  0,  0,  0,  0,  0,  0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+         5,  5, 10, 25, 25, 10,  5,  5,
+         0,  0,  0, 20, 20,  0,  0,  0,
+         5, -5,-10,  0,  0,-10, -5,  5,
+         5, 10, 10,-20,-20, 10, 10,  5,
+         0,  0,  0,  0,  0,  0,  0,  0),
+    "knight": (
+        -50,-40,-30,-30,-30,-30,-40,-50,
+        -40,-20,  0,  0,  0,  0,-20,-40,
+        -30,  0, 10, 15, 15, 10,  0,-30,
+        -30,  5, 15, 20, 20, 15,  5,-30,
+        -30,  0, 15, 20, 20, 15,  0,-30,
+        -30,  5, 10, 15, 15, 10,  5,-30,
+        -40,-20,  0,  5,  5,  0,-20,-40,
+        -50,-40,-30,-30,-30,-30,-40,-50),
+    "bishop": (
+        -20,-10,-10,-10,-10,-10,-10,-20,
+        -10,  0,  0,  0,  0,  0,  0,-10,
+        -10,  0,  5, 10, 10,  5,  0,-10,
+        -10,  5,  5, 10, 10,  5,  5,-10,
+        -10,  0, 10, 10, 10, 10,  0,-10,
+        -10, 10, 10, 10, 10, 10, 10,-10,
+        -10,  5,  0,  0,  0,  0,  5,-10,
+        -20,-10,-10,-10,-10,-10,-10,-20),
+    "rook": (
+         0,  0,  0,  0,  0,  0,  0,  0,
+         5, 10, 10, 10, 10, 10, 10,  5,
+        -5,  0,  0,  0,  0,  0,  0, -5,
+        -5,  0,  0,  0,  0,  0,  0, -5,
+        -5,  0,  0,  0,  0,  0,  0, -5,
+        -5,  0,  0,  0,  0,  0,  0, -5,
+        -5,  0,  0,  0,  0,  0,  0, -5,
+         0,  0,  0,  5,  5,  0,  0,  0),
+    "queen": (
+        -20,-10,-10, -5, -5,-10,-10,-20,
+        -10,  0,  0,  0,  0,  0,  0,-10,
+        -10,  0,  5,  5,  5,  5,  0,-10,
+         -5,  0,  5,  5,  5,  5,  0, -5,
+          0,  0,  5,  5,  5,  5,  0, -5,
+        -10,  5,  5,  5,  5,  5,  0,-10,
+        -10,  0,  5,  0,  0,  0,  0,-10,
+        -20,-10,-10, -5, -5,-10,-10,-20),
+    "king": (
+        -30,-40,-40,-50,-50,-40,-40,-30,
+        -30,-40,-40,-50,-50,-40,-40,-30,
+        -30,-40,-40,-50,-50,-40,-40,-30,
+        -30,-40,-40,-50,-50,-40,-40,-30,
+        -20,-30,-30,-40,-40,-30,-30,-20,
+        -10,-20,-20,-20,-20,-20,-20,-10,
+         20, 20,  0,  0,  0,  0, 20, 20,
+         20, 30, 10,  0,  0, 10, 30, 20),
+}
+_KING_ENDGAME_TABLE = (
+    -50,-40,-30,-20,-20,-30,-40,-50,
+    -30,-20,-10,  0,  0,-10,-20,-30,
+    -30,-10, 20, 30, 30, 20,-10,-30,
+    -30,-10, 30, 40, 40, 30,-10,-30,
+    -30,-10, 30, 40, 40, 30,-10,-30,
+    -30,-10, 20, 30, 30, 20,-10,-30,
+    -30,-30,  0,  0,  0,  0,-30,-30,
+    -50,-30,-30,-30,-30,-30,-30,-50)
+
+
+def _square_values(piece_type: str, color: str, table) -> list[int]:
+    """Signed value (positive for white) of the piece on each square index row * 8 + col."""
+    values = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        table_row = 7 - row if color == "white" else row # Tables have the 8th rank first
+        value = PIECE_VALUES[piece_type] + table[table_row * 8 + col]
+        values.append(value if color == "white" else -value)
+    return values
+
+# PSQ_MIDDLEGAME[(color, piece_type)][sq] and PSQ_ENDGAME[...]: white-positive values
+PSQ_MIDDLEGAME = {(color, piece_type): _square_values(piece_type, color, _TABLES[piece_type])
+                for color in COLORS for piece_type in PIECE_TYPES}
+PSQ_ENDGAME = {(color, piece_type): _square_values(piece_type, color,
+                                                    _KING_ENDGAME_TABLE if piece_type == "king" else _TABLES[piece_type])
+            for color in COLORS for piece_type in PIECE_TYPES}
+
+
+def blend(middlegame: int, endgame: int, phase: int) -> int:
+    """Mixes the two scores by the game phase (MAX_PHASE = middlegame, 0 = endgame)."""
+    phase = min(phase, MAX_PHASE)
+    return (middlegame * phase + endgame * (MAX_PHASE - phase)) // MAX_PHASE
+
+def evaluate(position) -> int:
+    """Score in centipawns from the side to move's point of view, from the position's running sums."""
+    score = blend(position.psq_middlegame, position.psq_endgame, position.phase)
+    return score if position.side_to_move == "white" else -score
+
+def evaluate_from_scratch(position) -> int:
+    """Same as evaluate(), but summed over the pieces. For checking the running sums."""
+    middlegame = endgame = phase = 0
+    for piece in position:
+        sq = int(piece.row) * 8 + int(piece.col)
+        middlegame += PSQ_MIDDLEGAME[(piece.color, piece.piece_type)][sq]
+        endgame += PSQ_ENDGAME[(piece.color, piece.piece_type)][sq]
+        phase += PHASE_WEIGHTS[piece.piece_type]
+    score = blend(middlegame, endgame, phase)
+    return score if position.side_to_move == "white" else -score
@@ -0,0 +1,107 @@
+"""
+Forsyth-Edwards Notation (FEN) for positions.
+
+A FEN string lists the board rank by rank from the 8th down (pieces as
+letters, white upper case, digits for empty squares), then the side to
+move, castling rights, en-passant square and the two move clocks.
+"""
+
+import re
+
+from moves.position import Position, PieceState, WHITE, BLACK
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+PIECE_LETTERS = {"pawn": "p", "knight": "n", "bishop": "b", "rook": "r", "queen": "q", "king": "k"}
+LETTER_PIECES = {letter: piece_type for piece_type, letter in PIECE_LETTERS.items()}
+_CASTLING = re.compile(r"-|(?=.)K?Q?k?q?") # Each right at most once, in KQkq order
+_EP_SQUARE = re.compile(r"-|[a-h][36]")
+
+
+class FenError(ValueError):
+    """Raised for a malformed FEN string."""
+
+
+def parse_fen(fen: str) -> Position:
+    """Builds a sprite-free Position from a FEN string. Missing clock fields default to 0 and 1."""
+    fields = fen.split()
+    if len(fields) < 4:
+        raise FenError(f"FEN needs at least 4 fields: {fen!r}")
+    placement, side, castling, ep = fields[:4]
+
+    ranks = placement.split("/")
+    if len(ranks) != 8:
+        raise FenError(f"FEN board needs 8 ranks: {placement!r}")
+    pieces = []
+    for rank_index, rank in enumerate(ranks):
+        row = 7 - rank_index
+        col = 0
+        for char in rank:
+            if char.isdigit():
+                col += int(char)
+            elif char.lower() in LETTER_PIECES:
+                if col > 7:
+                    raise FenError(f"Too many squares in rank {rank!r}")
+                color = WHITE if char.isupper() else BLACK
+                pieces.append(PieceState(LETTER_PIECES[char.lower()], color, row, col))
+                col += 1
+            else:
+                raise FenError(f"Unknown piece letter {char!r}")
+        if col != 8:
+            raise FenError(f"Rank {rank!r} does not have 8 squares")
+
+    if side not in ("w", "b"):
+        raise FenError(f"Side to move must be 'w' or 'b': {side!r}")
+    if not _CASTLING.fullmatch(castling):
+        raise FenError(f"Castling rights must be '-' or letters of 'KQkq', each once and in that order: {castling!r}")
+    if not _EP_SQUARE.fullmatch(ep):
+        raise FenError(f"En-passant square must be '-' or on rank 3 or 6: {ep!r}")
+    position = Position(pieces, side_to_move=WHITE if side == "w" else BLACK)
+    position.castling_rights = "" if castling == "-" else castling
+    if ep != "-":
+        # Kept only when a pawn can actually capture en passant, like Position.make_move does
+        ep_row, ep_col = int(ep[1]) - 1, ord(ep[0]) - ord("a")
+        pawn_row = ep_row - 1 if position.side_to_move == WHITE else ep_row + 1
+        for side_col in (ep_col - 1, ep_col + 1):
+            neighbour = position.piece_at(pawn_row, side_col)
+            if neighbour is not None and neighbour.piece_type == "pawn" and neighbour.color == position.side_to_move:
+                position.ep_square = ep_row * 8 + ep_col
+                break
+    if not all(field.isdigit() for field in fields[4:6]):
+        raise FenError(f"Move clocks must be numbers: {' '.join(fields[4:6])!r}")
+    if len(fields) > 4:
+        position.halfmove_clock = int(fields[4])
+    if len(fields) > 5:
+        position.fullmove_number = int(fields[5])
+    return position
+
+
+def to_fen(position: Position) -> str:
+    """
+    FEN of a Position (the live board or a copy). The en-passant square is only
+    written when a pawn can capture there, since that's all the Position keeps.
+    """
+    ranks = []
+    for row in range(7, -1, -1):
+        rank = ""
+        empty = 0
+        for col in range(8):
+            piece = position.piece_at(row, col)
+            if piece is None:
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            letter = PIECE_LETTERS[piece.piece_type]
+            rank += letter.upper() if piece.color == WHITE else letter
+        if empty:
+            rank += str(empty)
+        ranks.append(rank)
+
+    ep = "-"
+    if position.ep_square is not None:
+        ep_row, ep_col = divmod(position.ep_square, 8)
+        ep = chr(ord("a") + ep_col) + str(ep_row + 1)
+    return " ".join(("/".join(ranks), "w" if position.side_to_move == WHITE else "b",
+                    position.castling_rights or "-", ep, str(position.halfmove_clock), str(position.fullmove_number)))
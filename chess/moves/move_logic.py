@@ -2,23 +2,24 @@
 Handles the logic for validating chess piece moves.
 """
 
-from components.pieces import Piece, Pawn, Rook, Knight, Bishop, Queen, King, WHITE, BLACK
+from moves.position import Position, PieceState, Move, WHITE, BLACK
+from moves import bitboard
+from moves.attack_cache import ATTACK_CACHE # Attack maps memoized per position
 
-def get_piece_at_square(target_row: int, target_col: int, all_pieces: list[Piece]) -> Piece | None:
-    """Checks if a piece exists at the given board coordinates."""
-    for piece in all_pieces:
-        if piece.row == target_row and piece.col == target_col:
-            return piece
-    return None
+# Pieces are matched on their piece_type string rather than their class, so the
+# same rules work for game pieces (components.pieces.Piece, which carry sprites)
+# and for the sprite-free PieceState objects used when simulating moves.
+Piece = PieceState # For type hinting
 
-def find_king(player_color: str, all_pieces: list[Piece]) -> Piece | None:
-    """Finds the king of the specified color."""
-    for piece in all_pieces:
-        if isinstance(piece, King) and piece.color == player_color:
-            return piece
-    return None # Should not happen in a normal game
+def get_piece_at_square(target_row: int, target_col: int, all_pieces: Position) -> Piece | None:
+    """Checks if a piece exists at the given board coordinates (O(1) mailbox lookup)."""
+    return all_pieces.piece_at(int(target_row), int(target_col))
 
-def is_move_valid(piece: Piece, new_row: int, new_col: int, all_pieces: list[Piece], board_size: int) -> bool:
+def find_king(player_color: str, all_pieces: Position) -> Piece | None:
+    """Finds the king of the specified color from the position's king cache."""
+    return all_pieces.king(player_color) # None should not happen in a normal game
+
+def is_move_valid(piece: Piece, new_row: int, new_col: int, all_pieces: Position, board_size: int) -> bool:
     """
     Checks if a move is valid for a given piece.
     This is a placeholder and needs to be expanded for each piece type.
@@ -32,7 +33,7 @@ def is_move_valid(piece: Piece, new_row: int, new_col: int, all_pieces: list[Pie
         return False
 
     # Add specific rules for each piece type
-    if isinstance(piece, Pawn):
+    if piece.piece_type == "pawn":
         # Basic pawn move: one step forward (simplistic, no capture/double step yet)
         direction = 1 if piece.color == WHITE else -1
         start_row_white = 1
@@ -62,8 +63,12 @@ def is_move_valid(piece: Piece, new_row: int, new_col: int, all_pieces: list[Pie
         if abs(new_col - piece.col) == 1 and new_row == piece.row + direction: # Moving one step diagonally forward
             if target_piece and target_piece.color != piece.color: # Must be an opponent's piece on the target square
                 return True
+            # En passant: onto the square an enemy pawn skipped with its double step, capturing that pawn
+            ep_row = 5 if piece.color == WHITE else 2
+            if not target_piece and new_row == ep_row and all_pieces.ep_square == int(new_row) * board_size + int(new_col):
+                return True
             
-    elif isinstance(piece, Rook):
+    elif piece.piece_type == "rook":
         if piece.row == new_row or piece.col == new_col:
             # Check for obstructions
             if piece.row == new_row: # Horizontal move
@@ -78,7 +83,7 @@ def is_move_valid(piece: Piece, new_row: int, new_col: int, all_pieces: list[Pie
                         return False # Path blocked
             return True # Path is clear or it's a capture on the target square
 
-    elif isinstance(piece, Knight):
+    elif piece.piece_type == "knight":
         # Knight can jump over pieces, so no obstruction check needed for its path.
         # The initial check for same-color piece on target square is sufficient.
         row_diff = abs(new_row - piece.row)
@@ -87,7 +92,7 @@ def is_move_valid(piece: Piece, new_row: int, new_col: int, all_pieces: list[Pie
         (row_diff == 1 and col_diff == 2):
             return True
 
-    elif isinstance(piece, Bishop):
+    elif piece.piece_type == "bishop":
         if abs(new_row - piece.row) == abs(new_col - piece.col):
             # Check for obstructions along the diagonal
             row_step = 1 if new_row > piece.row else -1
@@ -100,7 +105,7 @@ def is_move_valid(piece: Piece, new_row: int, new_col: int, all_pieces: list[Pie
                 current_col += col_step
             return True # Path is clear or it's a capture on the target square
 
-    elif isinstance(piece, Queen):
+    elif piece.piece_type == "queen":
         if piece.row == new_row or piece.col == new_col: # Horizontal or Vertical (like Rook)
             if piece.row == new_row: # Horizontal move
                 step = 1 if new_col > piece.col else -1
@@ -124,7 +129,7 @@ def is_move_valid(piece: Piece, new_row: int, new_col: int, all_pieces: list[Pie
                 current_col += col_step
             return True
 
-    elif isinstance(piece, King):
+    elif piece.piece_type == "king":
         # Basic king move: one square in any direction
         # King moves only one square, so no intermediate path to check for obstruction.
         # The initial check for same-color piece on target square is sufficient.
@@ -132,125 +137,65 @@ def is_move_valid(piece: Piece, new_row: int, new_col: int, all_pieces: list[Pie
         col_diff = abs(new_col - piece.col)
         if row_diff <= 1 and col_diff <= 1:
             return True
+        # Castling: the king moves two squares towards a rook
+        if row_diff == 0 and col_diff == 2:
+            return _is_castling_valid(piece, int(new_col), all_pieces)
 
     return False # Default to invalid if no rule matches or for unhandled pieces
 
-def _is_square_attacked_by_pawn(pawn: Pawn, target_row: int, target_col: int) -> bool:
-    """Checks if a specific square is attacked by this pawn."""
-    direction = 1 if pawn.color == WHITE else -1
-    # A pawn attacks the squares one step diagonally forward from its current position.
-    if pawn.row + direction == target_row:
-        if pawn.col + 1 == target_col or pawn.col - 1 == target_col:
-            return True
-    return False
-
-def is_square_attacked(target_row: int, target_col: int, attacker_color: str, all_pieces: list[Piece], board_size: int) -> bool:
+def _is_castling_valid(king: Piece, new_col: int, all_pieces: Position) -> bool:
+    """
+    The castling right is still held (king and rook haven't moved), the squares
+    between them are empty, and the king is not in check and doesn't pass over
+    an attacked square. is_move_legal() tests the destination like any king move.
+    """
+    home_row = 0 if king.color == WHITE else 7
+    if int(king.row) != home_row or int(king.col) != 4:
+        return False
+    kingside = new_col == 6
+    right = "K" if kingside else "Q"
+    if king.color == BLACK:
+        right = right.lower()
+    if right not in all_pieces.castling_rights:
+        return False
+    rook_col = 7 if kingside else 0
+    rook = get_piece_at_square(home_row, rook_col, all_pieces)
+    if rook is None or rook.piece_type != "rook" or rook.color != king.color:
+        return False
+    for col in range(min(rook_col, 4) + 1, max(rook_col, 4)):
+        if get_piece_at_square(home_row, col, all_pieces):
+            return False # Path blocked
+    enemy = BLACK if king.color == WHITE else WHITE
+    for col in (4, 5 if kingside else 3): # Where the king stands and the square it passes
+        if bitboard.is_square_attacked(all_pieces, home_row * 8 + col, enemy):
+            return False
+    return True
+
+def is_square_attacked(target_row: int, target_col: int, attacker_color: str, all_pieces: Position, board_size: int) -> bool:
     """
     Checks if a square (target_row, target_col) is attacked by any piece of attacker_color.
+    Uses the attack map of the position, cached by its Zobrist key.
     """
-    for piece in all_pieces:
-        if piece.color == attacker_color:
-            if isinstance(piece, Pawn):
-                if _is_square_attacked_by_pawn(piece, target_row, target_col):
-                    return True
-            else:
-                # For other pieces, their standard move validity (ignoring if target is same color for attack check)
-                # is_move_valid already checks if piece can reach the square, including obstructions.
-                # The initial check in is_move_valid (target_piece.color == piece.color) handles not "attacking" through own piece.
-                if is_move_valid(piece, target_row, target_col, all_pieces, board_size):
-                    return True
-    return False
+    return ATTACK_CACHE.is_square_attacked(all_pieces, bitboard.square_index(int(target_row), int(target_col)), attacker_color)
 
-def is_king_in_check(king_color: str, all_pieces: list[Piece], board_size: int) -> bool:
-    """Checks if the king of the specified color is currently in check."""
-    king = find_king(king_color, all_pieces)
-    if not king:
-        return False # Should not happen
-    opponent_color = BLACK if king_color == WHITE else WHITE
-    return is_square_attacked(king.row, king.col, opponent_color, all_pieces, board_size)
+def is_king_in_check(king_color: str, all_pieces: Position, board_size: int) -> bool:
+    """Checks if the king of the specified color is currently in check (cached per position)."""
+    return ATTACK_CACHE.is_king_in_check(all_pieces, king_color)
+
+def is_move_legal(piece: Piece, new_row: int, new_col: int, all_pieces: Position, board_size: int) -> bool:
+    """
+    Checks if a move is valid and does not leave the mover's own king in check.
+    The move is tried with make_move/unmake_move on the position itself, so no board copy is made.
+    """
+    if not is_move_valid(piece, new_row, new_col, all_pieces, board_size):
+        return False
+    all_pieces.make_move(Move(int(piece.row) * board_size + int(piece.col), int(new_row) * board_size + int(new_col)))
+    in_check = bitboard.is_king_in_check(all_pieces, piece.color) # Trial positions would only churn the cache
+    all_pieces.unmake_move()
+    return not in_check
 
 def coords_to_algebraic(row: int, col: int) -> str:
     """Converts 0-indexed board coordinates to algebraic notation (e.g., (0,0) -> "a1")."""
     file = chr(ord('a') + col)
     rank = str(row + 1) # Assuming row 0 is rank '1'
     return f"{file}{rank}"
-
-def get_piece_algebraic_prefix(piece_type: str) -> str:
-    """Gets the algebraic notation prefix for a piece type (empty for pawn)."""
-    if piece_type == "pawn": return ""
-    if piece_type == "knight": return "N"
-    if piece_type == "bishop": return "B"
-    if piece_type == "rook": return "R"
-    if piece_type == "queen": return "Q"
-    if piece_type == "king": return "K"
-    return "?" # Should not happen for valid piece types
-
-def get_promoted_piece_char(piece_type_name: str | None) -> str | None:
-    """Converts promoted piece type name (e.g., 'Queen') to its algebraic character (e.g., 'Q')."""
-    if not piece_type_name:
-        return None
-    # Assuming piece_type_name matches the class name like 'Queen', 'Rook'
-    if piece_type_name == "Queen": return "Q"
-    if piece_type_name == "Rook": return "R"
-    if piece_type_name == "Bishop": return "B"
-    if piece_type_name == "Knight": return "N"
-    return None
-
-def format_move_to_algebraic(
-    all_pieces_before_move: list[Piece], # Board state *before* this move
-    board_size: int,
-    moved_piece_original_row: int,
-    moved_piece_original_col: int,
-    moved_piece_type: str,
-    moved_piece_color: str,
-    dest_row: int,
-    dest_col: int,
-    was_capture: bool,
-    promoted_to_char: str | None, # Single character like "Q", "N"
-    is_check_after_move: bool,
-    is_checkmate_after_move: bool,
-    # TODO: Add is_castling_kingside, is_castling_queenside flags
-) -> str:
-    """
-    Formats a move into short algebraic notation.
-    Note: Disambiguation logic is complex and is simplified here.
-    Castling notation (O-O, O-O-O) is not yet implemented.
-    """
-    notation_parts = []
-    is_pawn = (moved_piece_type == "pawn")
-
-    # 1. Piece Prefix (or pawn capture file)
-    if is_pawn:
-        if was_capture:
-            notation_parts.append(chr(ord('a') + moved_piece_original_col)) # e.g., "e" for exd5
-    else:
-        notation_parts.append(get_piece_algebraic_prefix(moved_piece_type))
-
-    # 2. Disambiguation (Simplified - TODO: Implement full disambiguation)
-    # Full disambiguation requires checking if other identical pieces could also move to dest_square
-    # from all_pieces_before_move, and then adding file, rank, or both from the original square.
-    # Example: If two Knights can go to f3, it becomes Ngf3 or Ndf3.
-    # For now, this is omitted for brevity in this initial implementation.
-
-    # 3. Capture Indication
-    if was_capture:
-        notation_parts.append("x")
-
-    # 4. Destination Square
-    notation_parts.append(coords_to_algebraic(dest_row, dest_col))
-
-    # 5. Pawn Promotion
-    if promoted_to_char:
-        notation_parts.append("=" + promoted_to_char)
-
-    # 6. Check/Checkmate Suffix
-    if is_checkmate_after_move:
-        notation_parts.append("#")
-    elif is_check_after_move:
-        notation_parts.append("+")
-
-    # Handle Castling (if implemented and flags are passed)
-    # if is_castling_kingside: return "O-O" + ("#" if is_checkmate_after_move else "+" if is_check_after_move else "")
-    # if is_castling_queenside: return "O-O-O" + ("#" if is_checkmate_after_move else "+" if is_check_after_move else "")
-
-    return "".join(notation_parts)
\ No newline at end of file
@@ -0,0 +1,233 @@
+"""
+PGN (Portable Game Notation) reading and writing.
+
+iter_games() is a generator that reads PGN one line at a time and yields
+each game as soon as its result is read, so a game collection of any size
+is read in constant memory. Comments, variations and NAGs are skipped.
+replay() plays a game's moves through the legal move generator (and
+optionally move_logic's piece rules) and reports the first move that isn't
+legal or whose check / mate mark is wrong.
+
+Replay a whole collection and report throughput, from the chess folder
+(.pgn, .pgn.gz or .pgn.bz2):
+    python -m moves.pgn games.pgn --validate
+"""
+
+import argparse
+import bz2
+import gzip
+import re
+import time
+from typing import Iterable, Iterator, NamedTuple
+
+from moves import bitboard, move_logic
+from moves.fen import parse_fen, FenError, START_FEN
+from moves.position import Position, WHITE
+from moves.san import parse_san, SanError
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+SEVEN_TAG_ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+
+_TAG = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# A whole {comment} (or the start of one that goes on to later lines), a ;comment
+# to the end of the line, a parenthesis, or a word
+_TOKEN = re.compile(r"\{[^}]*(\})?|;.*|[()]|[^\s{}();]+")
+_MOVE_NUMBER = re.compile(r"^\d+\.+")
+
+
+class PgnGame(NamedTuple):
+    tags: dict[str, str]
+    sans: list[str]
+    result: str
+    line_number: int # Line of the file the game starts on, for error messages
+
+    def start_fen(self) -> str:
+        return self.tags.get("FEN", START_FEN)
+
+
+class PgnError(ValueError):
+    """Raised when a game's moves can't be replayed."""
+
+
+def open_pgn(path: str):
+    """Opens a PGN file for reading as text, decompressing .gz and .bz2 files on the fly."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+def iter_games(lines: Iterable[str]) -> Iterator[PgnGame]:
+    """Yields the games in PGN text given as lines (e.g. an open file)."""
+    tags: dict[str, str] = {}
+    sans: list[str] = []
+    start_line = 1
+    in_comment = False # Inside a {comment} that spans lines
+    variation_depth = 0
+
+    for line_number, line in enumerate(lines, 1):
+        if in_comment:
+            end = line.find("}")
+            if end < 0:
+                continue
+            line = line[end + 1:]
+            in_comment = False
+        stripped = line.strip()
+        if not stripped or stripped.startswith("%"): # "%" lines are escaped
+            continue
+        if stripped.startswith("[") and variation_depth == 0:
+            tag = _TAG.match(stripped)
+            if tag is None:
+                continue
+            if sans: # The previous game ended without a result
+                yield PgnGame(tags, sans, tags.get("Result", "*"), start_line)
+                tags, sans = {}, []
+            if not tags:
+                start_line = line_number
+            tags[tag.group(1)] = tag.group(2).replace('\\"', '"').replace("\\\\", "\\")
+            continue
+
+        if not tags and not sans:
+            start_line = line_number
+        for token in _TOKEN.finditer(stripped):
+            text = token.group()
+            if text[0] == "{":
+                in_comment = token.group(1) is None
+            elif text[0] == ";":
+                pass
+            elif text == "(":
+                variation_depth += 1
+            elif text == ")":
+                variation_depth = max(0, variation_depth - 1)
+            elif variation_depth:
+                pass
+            elif text in RESULTS:
+                yield PgnGame(tags, sans, text, start_line)
+                tags, sans = {}, []
+            else:
+                text = _MOVE_NUMBER.sub("", text) # "1.", "1...", "1.e4"
+                if text and text[0] != "$": # NAGs like "$1"
+                    sans.append(text.rstrip("!?"))
+    if sans or tags:
+        yield PgnGame(tags, sans, tags.get("Result", "*"), start_line)
+
+
+def replay(game: PgnGame, validate: bool = False) -> Position:
+    """
+    Plays the game from its start position and returns the final position.
+    Raises PgnError at the first move that isn't legal, or whose "+" / "#"
+    doesn't match the position. With validate, every move is also checked
+    against move_logic's piece rules.
+    """
+    try:
+        position = parse_fen(game.start_fen())
+    except FenError as error:
+        raise PgnError(f"game at line {game.line_number}: bad FEN tag: {error}") from None
+    legal_moves, checkers = bitboard.legal_moves_and_checkers(position)
+    for ply, san in enumerate(game.sans, 1):
+        where = f"game at line {game.line_number}, ply {ply} ({san})"
+        try:
+            move = parse_san(position, san, legal_moves)
+        except SanError as error:
+            raise PgnError(f"{where}: {error}") from None
+        if validate:
+            piece = position.squares[move.from_sq]
+            if not move_logic.is_move_legal(piece, *bitboard.square_coords(move.to_sq), position, position.board_size):
+                raise PgnError(f"{where}: the generator allows the move but move_logic doesn't")
+        position.make_move(move)
+        legal_moves, checkers = bitboard.legal_moves_and_checkers(position)
+        if san.endswith("#") and (not checkers or legal_moves):
+            raise PgnError(f"{where}: marked as mate but it isn't")
+        if san.endswith("+") and (not checkers or not legal_moves):
+            raise PgnError(f"{where}: marked as check but it is {'mate' if checkers else 'no check'}")
+    return position
+
+
+def format_game(sans: list[str], result: str = "*", tags: dict[str, str] | None = None,
+                start_fen: str = START_FEN) -> str:
+    """
+    One game as PGN: the Seven Tag Roster ("?" when unknown), then the
+    other tags, then the movetext in lines of at most 80 characters.
+    """
+    tags = dict(tags or {})
+    tags["Result"] = result
+    if start_fen != START_FEN:
+        tags["SetUp"] = "1"
+        tags["FEN"] = start_fen
+    names = list(SEVEN_TAG_ROSTER) + [name for name in tags if name not in SEVEN_TAG_ROSTER]
+    lines = []
+    for name in names:
+        value = tags.get(name, "?").replace("\\", "\\\\").replace('"', '\\"')
+        lines.append(f'[{name} "{value}"]')
+    lines.append("")
+
+    start = parse_fen(start_fen)
+    move_number = start.fullmove_number
+    black_first = start.side_to_move != WHITE
+    tokens = []
+    for ply, san in enumerate(sans):
+        black_to_move = (ply % 2 == 1) != black_first
+        if not black_to_move:
+            tokens.append(f"{move_number}.")
+        elif ply == 0:
+            tokens.append(f"{move_number}...")
+        tokens.append(san)
+        if black_to_move:
+            move_number += 1
+    tokens.append(result)
+
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 80:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    return "\n".join(lines) + "\n\n"
+
+
+def validate_file(path: str, validate: bool = False, max_games: int | None = None,
+                  max_errors: int = 10) -> dict:
+    """Replays every game of a PGN file. Returns counts, the first errors and throughput."""
+    stats = {"games": 0, "plies": 0, "bad_games": 0, "errors": [], "bytes": 0}
+
+    def counted(file):
+        for line in file:
+            stats["bytes"] += len(line.encode("utf-8")) # Bytes of PGN text (decompressed), not characters
+            yield line
+
+    start = time.perf_counter()
+    with open_pgn(path) as file:
+        for game in iter_games(counted(file)):
+            if max_games is not None and stats["games"] >= max_games:
+                break
+            stats["games"] += 1
+            try:
+                replay(game, validate)
+                stats["plies"] += len(game.sans)
+            except (PgnError, ValueError) as error: # ValueError: anything else malformed in the game
+                stats["bad_games"] += 1
+                if len(stats["errors"]) < max_errors:
+                    stats["errors"].append(str(error))
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    stats.update(seconds=elapsed, games_per_second=stats["games"] / elapsed,
+                 plies_per_second=stats["plies"] / elapsed, mb_per_second=stats["bytes"] / elapsed / 1e6)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the games of a PGN file through the move validator.")
+    parser.add_argument("path", help="PGN file (.pgn, .pgn.gz or .pgn.bz2)")
+    parser.add_argument("--validate", action="store_true", help="Also check every move with move_logic (slower)")
+    parser.add_argument("--max-games", type=int, default=None)
+    args = parser.parse_args()
+    stats = validate_file(args.path, args.validate, args.max_games)
+    for error in stats["errors"]:
+        print(error)
+    print(f"{stats['games']} games, {stats['plies']} plies, {stats['bad_games']} with errors, "
+          f"in {stats['seconds']:.2f}s")
+    print(f"{stats['games_per_second']:.1f} games/s, {stats['plies_per_second']:.0f} plies/s, "
+          f"{stats['mb_per_second']:.2f} MB/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+"""
+Headless board model used for move simulation.
+
+A Position only stores the logical state of the pieces (type, color, square).
+It never creates arcade sprites or loads images, so it is cheap to copy when
+the rules code needs to try a move out before accepting it. For search and
+legality testing, make_move()/unmake_move() change a position in place and
+restore it exactly, so no copy is needed at all.
+"""
+
+from typing import NamedTuple
+
+from moves import zobrist
+from moves import evaluation
+
+WHITE = "white"
+BLACK = "black"
+PIECE_TYPES = ("pawn", "knight", "bishop", "rook", "queen", "king")
+
+# Castling rights (FEN letters) lost when a move starts or ends on these squares
+CASTLING_RIGHTS_BY_SQUARE = {0: "Q", 4: "KQ", 7: "K", 56: "q", 60: "kq", 63: "k"}
+# Castling is a king move of two files; the rook jumps from/to these squares, by king destination
+CASTLING_ROOK_SQUARES = {6: (7, 5), 2: (0, 3), 62: (63, 61), 58: (56, 59)}
+
+
+def opponent(color: str) -> str:
+    return BLACK if color == WHITE else WHITE
+
+
+PROMOTION_LETTERS = {"queen": "q", "rook": "r", "bishop": "b", "knight": "n"}
+
+
+class Move(NamedTuple):
+    from_sq: int # Square index row * 8 + col
+    to_sq: int
+    promotion: str | None = None # piece_type the pawn promotes to, e.g. "queen"
+
+    def uci(self) -> str:
+        """Long algebraic (UCI) form, e.g. "e2e4" or "e7e8q"."""
+        text = "".join(chr(ord("a") + sq % 8) + str(sq // 8 + 1) for sq in (self.from_sq, self.to_sq))
+        return text + (PROMOTION_LETTERS[self.promotion] if self.promotion else "")
+
+    @classmethod
+    def from_uci(cls, text: str) -> "Move":
+        from_sq = (int(text[1]) - 1) * 8 + ord(text[0]) - ord("a")
+        to_sq = (int(text[3]) - 1) * 8 + ord(text[2]) - ord("a")
+        promotion = None
+        if len(text) > 4:
+            promotion = next(name for name, letter in PROMOTION_LETTERS.items() if letter == text[4].lower())
+        return cls(from_sq, to_sq, promotion)
+
+
+class Undo(NamedTuple):
+    """Everything unmake_move() needs to restore the position before a move."""
+    move: Move
+    moved_piece: object
+    captured: object | None
+    captured_index: int # Position of the captured piece in Position.pieces
+    promoted_piece: object | None
+    pawn_index: int # Position of the promoting pawn in Position.pieces
+    castling_rights: str
+    ep_square: int | None
+    halfmove_clock: int
+    key: int # Zobrist key before the move
+
+
+class PieceState:
+    """Logical copy of a piece: type, color and square, without a sprite."""
+    __slots__ = ("piece_type", "color", "row", "col")
+
+    def __init__(self, piece_type: str, color: str, row: int, col: int):
+        self.piece_type = piece_type
+        self.color = color
+        self.row = row
+        self.col = col
+
+    @classmethod
+    def from_piece(cls, piece) -> "PieceState":
+        """Copies the logical attributes of any piece-like object (e.g. components.pieces.Piece)."""
+        return cls(piece.piece_type, piece.color, int(piece.row), int(piece.col))
+
+    def __repr__(self) -> str:
+        return f"PieceState({self.piece_type!r}, {self.color!r}, {self.row}, {self.col})"
+
+
+class Position:
+    """
+    A chess position that move_logic can operate on.
+
+    Pieces are kept in a list and indexed by an 8x8 mailbox (one slot per
+    square) plus a cache of each king, so occupancy and king lookups are O(1).
+    It behaves like a list of pieces (iterate, append, remove, clear), which
+    lets the game keep its live Piece objects in one; copies made with
+    from_pieces() hold sprite-free PieceStates instead.
+    The same index is mirrored as 64-bit occupancy masks per color and piece
+    type (bit row * 8 + col) for the bitboard move generator, and summarized
+    by a Zobrist key (see moves/zobrist.py) that identifies the position, and
+    by running material + piece-square sums for moves/evaluation.py.
+    Pieces must be moved through move_piece() so the index stays in sync.
+    The keys of the earlier positions of the game are kept on a stack with a
+    count per key, so repetitions are found in O(1) (see push_history()).
+    """
+
+    def __init__(self, pieces=None, board_size: int = 8, side_to_move: str = WHITE):
+        self.board_size = board_size
+        self.key = 0
+        self._side_to_move = WHITE
+        self._castling_rights = ""
+        self._ep_square = None
+        self.side_to_move = side_to_move
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self._undo_stack: list[Undo] = []
+        self.key_history: list[int] = [] # Keys of the earlier positions, oldest first
+        self._key_counts: dict[int, int] = {} # How often each key is in key_history
+        self.pieces = []
+        self.squares = [None] * (board_size * board_size) # Mailbox: index row * board_size + col
+        self.kings = {WHITE: None, BLACK: None}
+        self._reset_bitboards()
+        for piece in pieces or ():
+            self.append(piece)
+
+    # Side to move, castling rights and en-passant square are part of the key,
+    # so they are properties that keep it up to date when set.
+    @property
+    def side_to_move(self) -> str:
+        return self._side_to_move
+
+    @side_to_move.setter
+    def side_to_move(self, color: str):
+        if color != self._side_to_move:
+            self.key ^= zobrist.SIDE_KEY
+            self._side_to_move = color
+
+    @property
+    def castling_rights(self) -> str:
+        """FEN style, e.g. "KQkq"."""
+        return self._castling_rights
+
+    @castling_rights.setter
+    def castling_rights(self, rights: str):
+        self.key ^= zobrist.castling_key(self._castling_rights) ^ zobrist.castling_key(rights)
+        self._castling_rights = rights
+
+    @property
+    def ep_square(self) -> int | None:
+        """Square a pawn skipped over on the last move, if an enemy pawn stands ready to capture it."""
+        return self._ep_square
+
+    @ep_square.setter
+    def ep_square(self, sq: int | None):
+        self.key ^= zobrist.ep_key(self._ep_square) ^ zobrist.ep_key(sq)
+        self._ep_square = sq
+
+    def _reset_bitboards(self):
+        self.bitboards = {color: {piece_type: 0 for piece_type in PIECE_TYPES} for color in (WHITE, BLACK)}
+        self.occupied = {WHITE: 0, BLACK: 0}
+        self.psq_middlegame = 0 # White-positive sums of evaluation.PSQ_* over the pieces
+        self.psq_endgame = 0
+        self.phase = 0 # Sum of evaluation.PHASE_WEIGHTS
+
+    @classmethod
+    def from_pieces(cls, pieces, board_size: int = 8, side_to_move: str = WHITE) -> "Position":
+        """Builds a Position from game pieces (or PieceStates), copying only their logical state."""
+        return cls([PieceState.from_piece(p) for p in pieces], board_size, side_to_move)
+
+    def copy(self) -> "Position":
+        position = Position.from_pieces(self.pieces, self.board_size, self.side_to_move)
+        position.castling_rights = self.castling_rights
+        position.ep_square = self.ep_square
+        position.halfmove_clock = self.halfmove_clock
+        position.fullmove_number = self.fullmove_number
+        position.set_key_history(self.key_history)
+        return position
+
+    # Repetitions. A position can't come back after a capture, a pawn move or a
+    # lost castling right (they change its key for good), so counting every key
+    # of the game finds repetitions exactly.
+    def push_history(self):
+        """Records the current position before a move is played (make_move() does this itself)."""
+        self.key_history.append(self.key)
+        self._key_counts[self.key] = self._key_counts.get(self.key, 0) + 1
+
+    def pop_history(self):
+        key = self.key_history.pop()
+        count = self._key_counts[key] - 1
+        if count:
+            self._key_counts[key] = count
+        else:
+            del self._key_counts[key]
+
+    def set_key_history(self, keys):
+        """Replaces the earlier positions, e.g. with the game's history for a search on a copy."""
+        self.key_history = list(keys)
+        self._key_counts = {}
+        for key in self.key_history:
+            self._key_counts[key] = self._key_counts.get(key, 0) + 1
+
+    def reversible_history(self) -> list[int]:
+        """Keys of the earlier positions since the last capture or pawn move, the only ones that can come back."""
+        return self.key_history[max(0, len(self.key_history) - self.halfmove_clock):]
+
+    def repetition_count(self) -> int:
+        """How many times the current position has occurred, this time included."""
+        return self._key_counts.get(self.key, 0) + 1
+
+    def is_fifty_move_draw(self) -> bool:
+        return self.halfmove_clock >= 100
+
+    def _index(self, row: int, col: int) -> int:
+        return int(row) * self.board_size + int(col)
+
+    def __iter__(self):
+        return iter(self.pieces)
+
+    def __len__(self) -> int:
+        return len(self.pieces)
+
+    def __contains__(self, piece) -> bool:
+        return self.squares[self._index(piece.row, piece.col)] is piece
+
+    def append(self, piece):
+        """Places a piece on its square, replacing the index entry for that square."""
+        index = self._index(piece.row, piece.col)
+        self.pieces.append(piece)
+        self.squares[index] = piece
+        self.bitboards[piece.color][piece.piece_type] |= 1 << index
+        self.occupied[piece.color] |= 1 << index
+        self.key ^= zobrist.PIECE_KEYS[(piece.color, piece.piece_type)][index]
+        self.psq_middlegame += evaluation.PSQ_MIDDLEGAME[(piece.color, piece.piece_type)][index]
+        self.psq_endgame += evaluation.PSQ_ENDGAME[(piece.color, piece.piece_type)][index]
+        self.phase += evaluation.PHASE_WEIGHTS[piece.piece_type]
+        if piece.piece_type == "king":
+            self.kings[piece.color] = piece
+
+    def remove(self, piece) -> int:
+        """Takes a piece off the board. Returns its former index in self.pieces."""
+        list_index = self.pieces.index(piece)
+        del self.pieces[list_index]
+        index = self._index(piece.row, piece.col)
+        if self.squares[index] is piece:
+            self.squares[index] = None
+            self.bitboards[piece.color][piece.piece_type] &= ~(1 << index)
+            self.occupied[piece.color] &= ~(1 << index)
+            self.key ^= zobrist.PIECE_KEYS[(piece.color, piece.piece_type)][index]
+            self.psq_middlegame -= evaluation.PSQ_MIDDLEGAME[(piece.color, piece.piece_type)][index]
+            self.psq_endgame -= evaluation.PSQ_ENDGAME[(piece.color, piece.piece_type)][index]
+            self.phase -= evaluation.PHASE_WEIGHTS[piece.piece_type]
+        if self.kings.get(piece.color) is piece:
+            self.kings[piece.color] = None
+        return list_index
+
+    def _insert(self, list_index: int, piece):
+        """Puts a removed piece back at its old place in self.pieces (used by unmake_move)."""
+        self.append(piece)
+        self.pieces.insert(list_index, self.pieces.pop())
+
+    def clear(self):
+        self.pieces.clear()
+        self.squares = [None] * (self.board_size * self.board_size)
+        self.kings = {WHITE: None, BLACK: None}
+        self._reset_bitboards()
+        self.key = zobrist.compute_key(self) # Only side, castling and en passant are left
+        self.set_key_history(())
+
+    def piece_at(self, row: int, col: int):
+        if not (0 <= row < self.board_size and 0 <= col < self.board_size):
+            return None
+        return self.squares[self._index(row, col)]
+
+    def king(self, color: str):
+        return self.kings.get(color)
+
+    def move_piece(self, from_row: int, from_col: int, to_row: int, to_col: int):
+        """
+        Moves the piece standing on (from_row, from_col) to (to_row, to_col).
+        Returns the captured piece, if any.
+        """
+        moving_piece = self.piece_at(from_row, from_col)
+        if moving_piece is None:
+            return None
+        captured = self.piece_at(to_row, to_col)
+        if captured is not None and captured.color != moving_piece.color:
+            self.remove(captured)
+        else:
+            captured = None
+        from_index = self._index(from_row, from_col)
+        to_index = self._index(to_row, to_col)
+        self.squares[from_index] = None
+        moving_piece.row = to_row
+        moving_piece.col = to_col
+        self.squares[to_index] = moving_piece
+        move_mask = (1 << from_index) | (1 << to_index)
+        self.bitboards[moving_piece.color][moving_piece.piece_type] ^= move_mask
+        self.occupied[moving_piece.color] ^= move_mask
+        piece_id = (moving_piece.color, moving_piece.piece_type)
+        piece_keys = zobrist.PIECE_KEYS[piece_id]
+        self.key ^= piece_keys[from_index] ^ piece_keys[to_index]
+        middlegame_values = evaluation.PSQ_MIDDLEGAME[piece_id]
+        endgame_values = evaluation.PSQ_ENDGAME[piece_id]
+        self.psq_middlegame += middlegame_values[to_index] - middlegame_values[from_index]
+        self.psq_endgame += endgame_values[to_index] - endgame_values[from_index]
+        return captured
+
+    def make_move(self, move: Move):
+        """
+        Plays a move in place and pushes an undo record for unmake_move().
+        The move is not validated. Promotions add a new PieceState, so this is
+        meant for sprite-free positions (from_pieces() copies), not the live board.
+        """
+        undo_key = self.key
+        self.push_history()
+        from_row, from_col = divmod(move.from_sq, self.board_size)
+        to_row, to_col = divmod(move.to_sq, self.board_size)
+        piece = self.squares[move.from_sq]
+        captured = self.squares[move.to_sq]
+        if captured is None and move.to_sq == self.ep_square and piece.piece_type == "pawn":
+            captured = self.squares[from_row * self.board_size + to_col] # En passant: the pawn beside us
+        captured_index = -1
+        if captured is not None:
+            captured_index = self.remove(captured)
+        self.move_piece(from_row, from_col, to_row, to_col)
+        if piece.piece_type == "king" and abs(move.to_sq - move.from_sq) == 2:
+            rook_from, rook_to = CASTLING_ROOK_SQUARES[move.to_sq]
+            self.move_piece(*divmod(rook_from, self.board_size), *divmod(rook_to, self.board_size))
+
+        promoted_piece = None
+        pawn_index = -1
+        if move.promotion:
+            pawn_index = self.remove(piece)
+            promoted_piece = PieceState(move.promotion, piece.color, to_row, to_col)
+            self.append(promoted_piece)
+
+        self._undo_stack.append(Undo(move, piece, captured, captured_index, promoted_piece, pawn_index,
+                                    self.castling_rights, self.ep_square, self.halfmove_clock, undo_key))
+        self.update_move_state(piece, move.from_sq, move.to_sq, captured is not None)
+        self.side_to_move = opponent(self.side_to_move)
+
+    def update_move_state(self, piece, from_sq: int, to_sq: int, was_capture: bool):
+        """
+        Updates the state that is not stored on the pieces (en-passant square,
+        castling rights, move clocks) after piece moved from_sq -> to_sq.
+        Called by make_move(); the game calls it after move_piece() on the live board.
+        """
+        self.ep_square = None
+        to_row, to_col = divmod(to_sq, self.board_size)
+        if piece.piece_type == "pawn" and abs(to_sq - from_sq) == 2 * self.board_size:
+            # Only recorded when an enemy pawn could capture en passant, so the
+            # key doesn't tell apart positions that only differ by a useless ep square.
+            for side_col in (to_col - 1, to_col + 1):
+                neighbour = self.piece_at(to_row, side_col)
+                if neighbour is not None and neighbour.piece_type == "pawn" and neighbour.color != piece.color:
+                    self.ep_square = (from_sq + to_sq) // 2
+                    break
+        if self.castling_rights:
+            for sq in (from_sq, to_sq):
+                for right in CASTLING_RIGHTS_BY_SQUARE.get(sq, ""):
+                    self.castling_rights = self.castling_rights.replace(right, "")
+        if piece.piece_type == "pawn" or was_capture:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if piece.color == BLACK:
+            self.fullmove_number += 1
+
+    def unmake_move(self) -> Move:
+        """Takes back the last move played with make_move(). Returns that move."""
+        undo = self._undo_stack.pop()
+        move = undo.move
+        # The key is restored from the record below, so bypass the key-updating setters
+        self._side_to_move = opponent(self._side_to_move)
+        if self._side_to_move == BLACK:
+            self.fullmove_number -= 1
+        self._castling_rights = undo.castling_rights
+        self._ep_square = undo.ep_square
+        self.halfmove_clock = undo.halfmove_clock
+
+        to_row, to_col = divmod(move.to_sq, self.board_size)
+        from_row, from_col = divmod(move.from_sq, self.board_size)
+        if undo.promoted_piece is not None:
+            self.remove(undo.promoted_piece)
+            self._insert(undo.pawn_index, undo.moved_piece) # Pawn still holds the destination square
+        self.move_piece(to_row, to_col, from_row, from_col)
+        if undo.moved_piece.piece_type == "king" and abs(move.to_sq - move.from_sq) == 2:
+            rook_from, rook_to = CASTLING_ROOK_SQUARES[move.to_sq]
+            self.move_piece(*divmod(rook_to, self.board_size), *divmod(rook_from, self.board_size))
+        if undo.captured is not None:
+            self._insert(undo.captured_index, undo.captured) # Back on its own square (beside us after en passant)
+        self.key = undo.key
+        self.pop_history()
+        return move
+
+
+BACK_RANK = ("rook", "knight", "bishop", "queen", "king", "bishop", "knight", "rook")
+
+def starting_position() -> Position:
+    """The standard initial position, sprite-free."""
+    pieces = []
+    for col, piece_type in enumerate(BACK_RANK):
+        pieces.append(PieceState(piece_type, WHITE, 0, col))
+        pieces.append(PieceState("pawn", WHITE, 1, col))
+        pieces.append(PieceState("pawn", BLACK, 6, col))
+        pieces.append(PieceState(piece_type, BLACK, 7, col))
+    position = Position(pieces)
+    position.castling_rights = "KQkq"
+    return position
@@ -0,0 +1,135 @@
+"""
+Standard Algebraic Notation (SAN) for moves, e.g. "e4", "Nbd7", "exd5", "e8=Q+", "O-O".
+
+Both directions work from the legal moves of the position before the move,
+which the caller has usually generated already (the game caches them per
+turn), so writing or reading a move needs no board copy:
+format_san() takes the disambiguation from the other legal moves of the
+same piece type to the same square, and parse_san() filters the legal
+moves by the parsed piece, square and hint.
+"""
+
+from moves import bitboard
+from moves.position import Position, Move
+
+SAN_PIECES = {"N": "knight", "B": "bishop", "R": "rook", "Q": "queen", "K": "king"}
+SAN_LETTERS = {piece_type: letter for letter, piece_type in SAN_PIECES.items()}
+FILES = "abcdefgh"
+RANKS = "12345678"
+
+
+class SanError(ValueError):
+    """Raised when a SAN move is malformed, illegal or ambiguous in the position."""
+
+
+def square_name(sq: int) -> str:
+    return FILES[sq % 8] + RANKS[sq // 8]
+
+def is_castling(position: Position, move: Move) -> bool:
+    """A king moving two files is castling."""
+    piece = position.squares[move.from_sq]
+    return piece is not None and piece.piece_type == "king" and abs(move.to_sq - move.from_sq) == 2
+
+def is_en_passant(position: Position, move: Move) -> bool:
+    """A pawn moving diagonally onto an empty square captures en passant."""
+    piece = position.squares[move.from_sq]
+    return (piece is not None and piece.piece_type == "pawn" and move.from_sq % 8 != move.to_sq % 8
+            and position.squares[move.to_sq] is None)
+
+def check_suffix(checkers: int, legal_replies: list[Move]) -> str:
+    """"#", "+" or "" for the position after a move, from the opponent's checkers and legal replies."""
+    if not checkers:
+        return ""
+    return "+" if legal_replies else "#"
+
+
+def format_san(position: Position, move: Move, legal_moves: list[Move] | None = None) -> str:
+    """
+    SAN of a move of position.side_to_move, without the check suffix (add
+    check_suffix() once the move is played). legal_moves are the side's legal
+    moves in position, used for disambiguation; they are generated if not given.
+    A pawn move to the last rank without a promotion piece is written without "=X".
+    """
+    if is_castling(position, move):
+        return "O-O" if move.to_sq > move.from_sq else "O-O-O"
+    piece = position.squares[move.from_sq]
+    capture = position.squares[move.to_sq] is not None or is_en_passant(position, move)
+    destination = square_name(move.to_sq)
+
+    if piece.piece_type == "pawn":
+        san = (FILES[move.from_sq % 8] + "x" + destination) if capture else destination
+        if move.promotion:
+            san += "=" + SAN_LETTERS[move.promotion]
+        return san
+
+    if legal_moves is None:
+        legal_moves = bitboard.generate_legal_moves(position)
+    hint = ""
+    rivals = [other.from_sq for other in legal_moves
+              if other.to_sq == move.to_sq and other.from_sq != move.from_sq
+              and position.squares[other.from_sq].piece_type == piece.piece_type]
+    if rivals:
+        if all(sq % 8 != move.from_sq % 8 for sq in rivals):
+            hint = FILES[move.from_sq % 8]
+        elif all(sq // 8 != move.from_sq // 8 for sq in rivals):
+            hint = RANKS[move.from_sq // 8]
+        else:
+            hint = square_name(move.from_sq)
+    return SAN_LETTERS[piece.piece_type] + hint + ("x" if capture else "") + destination
+
+
+def parse_san(position: Position, san: str, legal_moves: list[Move] | None = None) -> Move:
+    """Finds the legal move of position.side_to_move that san describes."""
+    text = san.rstrip("+#!?")
+    if text.endswith("e.p."):
+        text = text[:-4].rstrip()
+    if legal_moves is None:
+        legal_moves = bitboard.generate_legal_moves(position)
+
+    if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        kingside = len(text) == 3
+        for move in legal_moves:
+            if is_castling(position, move) and (move.to_sq > move.from_sq) == kingside:
+                return move
+        raise SanError(f"{san!r} is not a legal move")
+
+    promotion = None
+    if "=" in text:
+        text, promotion_letter = text.split("=", 1)
+        promotion = SAN_PIECES.get(promotion_letter.upper())
+        if promotion is None or promotion == "king":
+            raise SanError(f"Bad promotion piece in {san!r}")
+    piece_type = "pawn"
+    if text[:1] in SAN_PIECES:
+        piece_type = SAN_PIECES[text[0]]
+        text = text[1:]
+    text = text.replace("x", "").replace("-", "") # "Nxf3", and long forms like "Ng1-f3"
+    if len(text) < 2 or text[-2] not in FILES or text[-1] not in RANKS:
+        raise SanError(f"Can't read the destination square of {san!r}")
+    to_sq = bitboard.square_index(RANKS.index(text[-1]), FILES.index(text[-2]))
+    from_col = from_row = None # Disambiguation: origin file, rank or both
+    for char in text[:-2]:
+        if char in FILES:
+            from_col = FILES.index(char)
+        elif char in RANKS:
+            from_row = RANKS.index(char)
+        else:
+            raise SanError(f"Can't read {san!r}")
+    if piece_type == "pawn" and promotion is None and to_sq // 8 in (0, 7):
+        promotion = "queen" # "e8" without "=Q" is read as a queen promotion
+
+    found = None
+    for move in legal_moves:
+        if move.to_sq != to_sq or move.promotion != promotion:
+            continue
+        if (from_col is not None and move.from_sq % 8 != from_col) or \
+                (from_row is not None and move.from_sq // 8 != from_row):
+            continue
+        if position.squares[move.from_sq].piece_type != piece_type:
+            continue
+        if found is not None:
+            raise SanError(f"{san!r} is ambiguous")
+        found = move
+    if found is None:
+        raise SanError(f"{san!r} is not a legal move")
+    return found
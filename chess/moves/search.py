@@ -0,0 +1,226 @@
+"""
+Alpha-beta search for the computer player.
+
+Negamax with alpha-beta pruning and iterative deepening: depth 1, 2, 3...
+is searched until the depth limit is reached or the time budget runs out,
+and the best move of the last finished iteration is returned. Moves are
+ordered previous best move first, then captures by MVV-LVA (most valuable
+victim, least valuable attacker), then killer moves and the history table.
+A short captures-only quiescence search settles exchanges at the leaves,
+which are scored by the incremental material + piece-square evaluation
+(moves/evaluation.py).
+Results are kept in a transposition table keyed by the position's Zobrist
+key, so positions reached again (by transposition or in the next
+iteration) reuse their score bounds and best move.
+A position that repeats one from earlier in the game or the search line
+(looked up in the position's key history) or that reaches the fifty-move
+limit scores as a draw, so lines that just repeat are pruned.
+"""
+
+import time
+
+from moves.position import Position, Move
+from moves import bitboard
+from moves.transposition import TranspositionTable, EXACT, LOWER, UPPER
+from moves.evaluation import evaluate, PIECE_VALUES
+
+MATE_SCORE = 100000
+INFINITY = 10 * MATE_SCORE
+MAX_PLY = 64
+TIME_CHECK_INTERVAL = 1024 # Nodes between clock reads
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget is used up."""
+
+
+def _score_to_tt(score: int, ply: int) -> int:
+    """Mate scores are stored relative to the node, not the root."""
+    if score >= MATE_SCORE - MAX_PLY:
+        return score + ply
+    if score <= -MATE_SCORE + MAX_PLY:
+        return score - ply
+    return score
+
+def _score_from_tt(score: int, ply: int) -> int:
+    if score >= MATE_SCORE - MAX_PLY:
+        return score - ply
+    if score <= -MATE_SCORE + MAX_PLY:
+        return score + ply
+    return score
+
+
+class Searcher:
+    def __init__(self, time_limit: float = 1.0, max_depth: int = 4, tt: TranspositionTable | None = None):
+        self.time_limit = time_limit # Seconds per move
+        self.max_depth = max_depth
+        self.tt = tt if tt is not None else TranspositionTable() # Kept between moves
+        self.should_stop = None # Optional callable; the search gives up (like a timeout) when it returns True
+        self.nodes = 0
+        self.completed_depth = 0
+        self.best_score = 0
+        self.elapsed = 0.0
+
+    def search(self, position: Position, start_depth: int = 1) -> Move | None:
+        """
+        Returns the best move for position.side_to_move, or None if there are no legal moves.
+        The position is searched in place with make_move/unmake_move and is left unchanged.
+        start_depth lets helper searches in a parallel search skip the first iteration.
+        """
+        start = time.perf_counter()
+        self.deadline = start + self.time_limit
+        self.nodes = 0
+        self.completed_depth = 0
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history: dict[tuple[int, int], int] = {}
+
+        root_moves = bitboard.generate_legal_moves(position)
+        if not root_moves:
+            return None
+        best_move = root_moves[0]
+        entry = self.tt.probe(position.key)
+        if entry is not None and entry.move in root_moves:
+            best_move = entry.move
+        for depth in range(min(start_depth, self.max_depth), self.max_depth + 1):
+            try:
+                score, move = self._search_root(position, root_moves, depth, best_move)
+            except SearchTimeout:
+                break # Keep the result of the last finished iteration
+            best_move = move
+            self.best_score = score
+            self.completed_depth = depth
+            if abs(score) >= MATE_SCORE - MAX_PLY:
+                break # Forced mate found, deeper search won't change the move
+        self.elapsed = time.perf_counter() - start
+        return best_move
+
+    def _check_time(self):
+        if time.perf_counter() > self.deadline or (self.should_stop is not None and self.should_stop()):
+            raise SearchTimeout()
+
+    def _search_root(self, position: Position, moves: list[Move], depth: int, previous_best: Move) -> tuple[int, Move]:
+        alpha, beta = -INFINITY, INFINITY
+        best_move = previous_best
+        for move in self._order_moves(position, moves, 0, previous_best):
+            position.make_move(move)
+            try:
+                score = -self._negamax(position, depth - 1, -beta, -alpha, 1)
+            finally:
+                position.unmake_move()
+            if score > alpha:
+                alpha = score
+                best_move = move
+        self.tt.store(position.key, depth, _score_to_tt(alpha, 0), EXACT, best_move)
+        return alpha, best_move
+
+    def _negamax(self, position: Position, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_INTERVAL == 0:
+            self._check_time()
+        if position.repetition_count() > 1:
+            return 0 # Repeating is a draw; once is enough, the side that can avoid it will
+        if depth <= 0 or ply >= MAX_PLY - 1:
+            return self._quiescence(position, alpha, beta, ply)
+
+        original_alpha = alpha
+        tt_move = None
+        entry = self.tt.probe(position.key)
+        if entry is not None:
+            tt_move = entry.move
+            if entry.depth >= depth:
+                score = _score_from_tt(entry.score, ply)
+                if entry.flag == EXACT:
+                    return score
+                if entry.flag == LOWER and score > alpha:
+                    alpha = score
+                elif entry.flag == UPPER and score < beta:
+                    beta = score
+                if alpha >= beta:
+                    return score
+
+        moves, checkers = bitboard.legal_moves_and_checkers(position)
+        if not moves:
+            return -MATE_SCORE + ply if checkers else 0 # Checkmate (prefer shorter mates) or stalemate
+        if position.is_fifty_move_draw():
+            return 0
+
+        best_score = -INFINITY
+        best_move = None
+        for move in self._order_moves(position, moves, ply, tt_move):
+            is_quiet = position.squares[move.to_sq] is None and move.promotion is None
+            position.make_move(move)
+            try:
+                score = -self._negamax(position, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                position.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if is_quiet: # Remember quiet moves that caused a cutoff
+                    killers = self.killers[ply]
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                    key = (move.from_sq, move.to_sq)
+                    self.history[key] = self.history.get(key, 0) + depth * depth
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(position.key, depth, _score_to_tt(best_score, ply), flag, best_move)
+        return best_score
+
+    def _quiescence(self, position: Position, alpha: int, beta: int, ply: int) -> int:
+        """Searches captures only, so the static evaluation is not taken in the middle of an exchange."""
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_INTERVAL == 0:
+            self._check_time()
+        stand_pat = evaluate(position)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        if ply >= MAX_PLY - 1:
+            return alpha
+
+        captures = [move for move in bitboard.generate_legal_moves(position)
+                    if position.squares[move.to_sq] is not None or move.promotion == "queen"]
+        for move in self._order_moves(position, captures, ply, None):
+            position.make_move(move)
+            try:
+                score = -self._quiescence(position, -beta, -alpha, ply + 1)
+            finally:
+                position.unmake_move()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def _order_moves(self, position: Position, moves: list[Move], ply: int, best_move: Move | None) -> list[Move]:
+        killers = self.killers[ply]
+        history = self.history
+        squares = position.squares
+
+        def move_score(move: Move) -> int:
+            if move == best_move:
+                return 3 * INFINITY
+            victim = squares[move.to_sq]
+            if victim is not None: # MVV-LVA
+                return 2 * INFINITY + 10 * PIECE_VALUES[victim.piece_type] - PIECE_VALUES[squares[move.from_sq].piece_type]
+            if move.promotion:
+                return 2 * INFINITY + PIECE_VALUES[move.promotion]
+            if move == killers[0]:
+                return INFINITY + 2
+            if move == killers[1]:
+                return INFINITY + 1
+            return history.get((move.from_sq, move.to_sq), 0)
+
+        return sorted(moves, key=move_score, reverse=True)
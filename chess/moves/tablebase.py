@@ -0,0 +1,395 @@
+"""
+Endgame tablebases: perfect play for endings with few pieces.
+
+A table holds one byte per position of a material signature such as "KQK"
+(white king and queen against the black king): 0 for a draw, 255 for an
+impossible position, otherwise distance to mate in plies + 1. An even
+distance means the side to move gets mated, an odd one that it mates.
+Positions are indexed by side to move and the square of every piece, in
+signature order (white pieces, then black), so a lookup is one byte read
+from a memory-mapped file. Positions where black has the extra material
+are looked up in the color-flipped table.
+
+Tables are generated by retrograde analysis with the game's own move
+generator. Worker processes list the legal moves of every position; the
+main process then works backwards from the checkmates one ply at a time.
+Captures and promotions lead into smaller tables, which are probed, so
+generate those first (e.g. KQK and KRK before KPK). From the chess folder:
+    python -m moves.tablebase KQK KRK KPK --processes 4
+
+Only 3-piece tables can be generated. The generator keeps every
+position's move list and predecessor list in memory (4-byte entries), which
+for a 4-piece table (2 * 64^4, about 33.5M positions, some 20 moves each)
+comes to several GB and hours of pure-Python work. Probing has no such
+limit, so a 4-piece table made elsewhere in this format would be used.
+"""
+
+import argparse
+import mmap
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from moves import bitboard
+from moves.position import Position, PieceState, Move, WHITE, BLACK, opponent
+
+TB_MAGIC = b"CHTB0001"
+SIGNATURE_BYTES = 8 # Signature stored after the magic, padded with spaces
+HEADER_BYTES = len(TB_MAGIC) + SIGNATURE_BYTES
+DRAW = 0
+INVALID = 255
+
+SIGNATURE_PIECES = {"K": "king", "Q": "queen", "R": "rook", "B": "bishop", "N": "knight", "P": "pawn"}
+PIECE_SIGNATURE_LETTERS = {piece_type: letter for letter, piece_type in SIGNATURE_PIECES.items()}
+_LETTER_ORDER = "KQRBNP" # Order of the pieces within one side of a signature
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "tablebases")
+DEFAULT_TABLES = ("KQK", "KRK", "KPK")
+MAX_GENERATED_PIECES = 3 # See the module docstring
+
+
+class TBResult(NamedTuple):
+    wdl: int # 1 = the side to move wins, 0 = draw, -1 = it loses
+    dtm: int | None # Plies until mate, None for a draw
+
+
+class MissingTableError(Exception):
+    """Raised when generating a table that leads into a table that isn't there yet."""
+
+
+def split_signature(signature: str) -> tuple[str, str]:
+    """"KQK" -> ("KQ", "K")."""
+    second_king = signature.index("K", 1)
+    return signature[:second_king], signature[second_king:]
+
+def _sort_side(letters: str) -> str:
+    return "".join(sorted(letters, key=_LETTER_ORDER.index))
+
+def material_signature(position: Position) -> str:
+    """The position's material as a signature, e.g. "KRKP"."""
+    sides = []
+    for color in (WHITE, BLACK):
+        sides.append(_sort_side("".join(PIECE_SIGNATURE_LETTERS[piece_type] * mask.bit_count()
+                                        for piece_type, mask in position.bitboards[color].items())))
+    return "".join(sides)
+
+def is_dead_draw(signature: str) -> bool:
+    """Neither side can ever mate: bare kings, or a lone bishop or knight against a bare king."""
+    white, black = split_signature(signature)
+    return sorted((white, black)) in (["K", "K"], ["K", "KB"], ["K", "KN"])
+
+def _decode(value: int) -> TBResult:
+    if value == DRAW:
+        return TBResult(0, None)
+    dtm = value - 1
+    return TBResult(1 if dtm % 2 else -1, dtm)
+
+def _piece_types(signature: str) -> list[tuple[str, str]]:
+    white, black = split_signature(signature)
+    return [(WHITE, SIGNATURE_PIECES[letter]) for letter in white] + \
+        [(BLACK, SIGNATURE_PIECES[letter]) for letter in black]
+
+def _mirror(position: Position) -> Position:
+    """Same position with the colors swapped and the board flipped top to bottom."""
+    pieces = [PieceState(piece.piece_type, opponent(piece.color), 7 - piece.row, piece.col) for piece in position]
+    return Position(pieces, side_to_move=opponent(position.side_to_move))
+
+def _squares_index(black_to_move: bool, squares: list[int]) -> int:
+    index = 1 if black_to_move else 0
+    for sq in squares:
+        index = index * 64 + sq
+    return index
+
+def _canonical(piece_types: list, squares: list[int]) -> list[int]:
+    """Squares of identical pieces in ascending order, as position_index() lists them."""
+    if len(set(piece_types)) == len(piece_types):
+        return squares
+    ordered = []
+    for piece in dict.fromkeys(piece_types):
+        ordered.extend(sorted(sq for other, sq in zip(piece_types, squares) if other == piece))
+    return ordered
+
+def position_index(signature: str, position: Position) -> int:
+    """Index of a position (with exactly the signature's material) in its table."""
+    squares = []
+    for color, piece_type in dict.fromkeys(_piece_types(signature)):
+        squares.extend(bitboard.iter_bits(position.bitboards[color][piece_type]))
+    return _squares_index(position.side_to_move == BLACK, squares)
+
+def table_size(signature: str) -> int:
+    return 2 * 64 ** len(signature)
+
+def _table_path(directory: str, signature: str) -> str:
+    return os.path.join(directory, f"{signature}.bin")
+
+
+class Tablebases:
+    """The tables found in a directory, memory-mapped when first probed."""
+
+    def __init__(self, directory: str = DATA_DIR):
+        self.directory = directory
+        self._tables: dict[str, mmap.mmap | None] = {}
+
+    def _table(self, signature: str) -> mmap.mmap | None:
+        if signature not in self._tables:
+            path = _table_path(self.directory, signature)
+            table = None
+            if os.path.exists(path):
+                with open(path, "rb") as file:
+                    table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                if table[:len(TB_MAGIC)] != TB_MAGIC or len(table) != HEADER_BYTES + table_size(signature):
+                    table.close()
+                    raise ValueError(f"{path} is not a {signature} tablebase")
+            self._tables[signature] = table
+        return self._tables[signature]
+
+    def available(self) -> list[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(self.directory) if name.endswith(".bin"))
+
+    def probe(self, position: Position) -> TBResult | None:
+        """
+        Win/draw/loss and distance to mate for the side to move, or None if the
+        position has no table. Dead draws need no table.
+        """
+        signature = material_signature(position)
+        if position.ep_square is not None or (position.castling_rights and "R" in signature):
+            return None # Not stored in the tables
+        if is_dead_draw(signature):
+            return TBResult(0, None)
+        table = self._table(signature)
+        if table is None:
+            white, black = split_signature(signature)
+            signature = black + white
+            table = self._table(signature)
+            if table is None:
+                return None
+            position = _mirror(position)
+        value = table[HEADER_BYTES + position_index(signature, position)]
+        if value == INVALID:
+            return None
+        return _decode(value)
+
+    def best_move(self, position: Position) -> tuple[Move, TBResult] | None:
+        """
+        The move that wins fastest, keeps the draw, or loses slowest, with the
+        probe result of the position. None if the position has no table.
+        """
+        result = self.probe(position)
+        if result is None:
+            return None
+        best_move, best_rank = None, None
+        for move in bitboard.generate_legal_moves(position):
+            position.make_move(move)
+            child = self.probe(position)
+            position.unmake_move()
+            if child is None:
+                continue
+            # Lower is better for the mover: opponent mated soon < opponent mated late < draw < mated late < mated soon
+            if child.wdl < 0:
+                rank = (0, child.dtm)
+            elif child.wdl == 0:
+                rank = (1, 0)
+            else:
+                rank = (2, -child.dtm)
+            if best_rank is None or rank < best_rank:
+                best_move, best_rank = move, rank
+        if best_move is None:
+            return None
+        return best_move, result
+
+    def close(self):
+        for table in self._tables.values():
+            if table is not None:
+                table.close()
+        self._tables.clear()
+
+
+# --- Generation ---
+
+_worker_tablebases: Tablebases | None = None
+
+def _list_moves(signature: str, directory: str, first_index: int, count: int) -> tuple:
+    """
+    Runs in a worker for the positions first_index .. first_index + count - 1.
+    Returns (start values, child offsets, internal children, external results):
+    start values are INVALID, 1 (checkmated) or DRAW (stalemate, or not known
+    yet); the internal children of position first_index + i, as indexes in the
+    same table, are children[offsets[i]:offsets[i + 1]]; external results are
+    (position, child's table value) pairs for captures and promotions.
+    """
+    global _worker_tablebases
+    if _worker_tablebases is None or _worker_tablebases.directory != directory:
+        _worker_tablebases = Tablebases(directory)
+    piece_types = _piece_types(signature)
+    values = bytearray(count)
+    offsets = array("I", [0])
+    children = array("I")
+    externals = []
+    for index in range(first_index, first_index + count):
+        values[index - first_index] = _list_position_moves(signature, piece_types, index, children, externals)
+        offsets.append(len(children))
+    return values, offsets, children, externals
+
+def _list_position_moves(signature: str, piece_types: list, index: int, children: array, externals: list) -> int:
+    squares = []
+    rest = index
+    for _ in piece_types:
+        squares.append(rest % 64)
+        rest //= 64
+    squares.reverse()
+    side_to_move = WHITE if rest == 0 else BLACK
+    if len(set(squares)) != len(squares):
+        return INVALID
+    pieces = [PieceState(piece_type, color, *bitboard.square_coords(sq))
+            for (color, piece_type), sq in zip(piece_types, squares)]
+    if any(piece.piece_type == "pawn" and piece.row in (0, 7) for piece in pieces):
+        return INVALID
+    position = Position(pieces, side_to_move=side_to_move)
+    if bitboard.is_king_in_check(position, opponent(side_to_move)):
+        return INVALID # The side that just moved can't be in check
+
+    moves, checkers = bitboard.legal_moves_and_checkers(position)
+    if not moves:
+        return 1 if checkers else DRAW # Checkmated (distance 0) or stalemate
+    slots = {sq: slot for slot, sq in enumerate(squares)}
+    for move in moves:
+        if position.squares[move.to_sq] is not None or move.promotion:
+            position.make_move(move)
+            child = _worker_tablebases.probe(position)
+            if child is None:
+                raise MissingTableError(f"{signature} needs the {material_signature(position)} table first")
+            externals.append((index, DRAW if child.wdl == 0 else child.dtm + 1))
+            position.unmake_move()
+        else: # Same material: the child's index only needs the moved piece's new square
+            child_squares = squares.copy()
+            child_squares[slots[move.from_sq]] = move.to_sq
+            children.append(_squares_index(side_to_move == WHITE, _canonical(piece_types, child_squares)))
+    return DRAW
+
+
+def generate_table(signature: str, directory: str = DATA_DIR, processes: int | None = None) -> dict:
+    """Generates and writes one table. Returns counts of won, drawn and lost positions and the longest mate."""
+    if len(signature) > MAX_GENERATED_PIECES:
+        raise ValueError(f"Can't generate {signature}: only tables of up to {MAX_GENERATED_PIECES} pieces fit in memory")
+    size = table_size(signature)
+    chunk = 64 ** (len(signature) - 1)
+    values = bytearray(size)
+    starts = array("I", bytes(4 * (size + 1))) # Child list of position i is children[starts[i]:starts[i + 1]]
+    children = array("I")
+    externals = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_list_moves, signature, directory, first, chunk) for first in range(0, size, chunk)]
+        for first, future in zip(range(0, size, chunk), futures):
+            chunk_values, offsets, chunk_children, chunk_externals = future.result()
+            values[first:first + chunk] = chunk_values
+            base = len(children)
+            for i in range(chunk):
+                starts[first + i] = base + offsets[i]
+            starts[first + chunk] = base + offsets[chunk]
+            children.extend(chunk_children)
+            externals.extend(chunk_externals)
+
+    # Who can reach each position, and how many of each position's moves are not yet known to lose
+    predecessor_counts = array("I", bytes(4 * (size + 1)))
+    for child in children:
+        predecessor_counts[child + 1] += 1
+    for i in range(size):
+        predecessor_counts[i + 1] += predecessor_counts[i]
+    predecessor_starts = predecessor_counts
+    fill = array("I", predecessor_starts)
+    predecessors = array("I", bytes(4 * len(children)))
+    remaining = array("I", bytes(4 * size))
+    for parent in range(size):
+        remaining[parent] = starts[parent + 1] - starts[parent]
+        for child in children[starts[parent]:starts[parent + 1]]:
+            predecessors[fill[child]] = parent
+            fill[child] += 1
+
+    # Captures and promotions into other tables: decided at the distance of their result
+    external_wins: dict[int, list[int]] = {} # distance -> parents whose move mates at that distance
+    external_losses: dict[int, list[int]] = {} # distance -> parents with one more move known to lose
+    for parent, child_value in externals:
+        if child_value == DRAW:
+            continue
+        child_dtm = child_value - 1
+        if child_dtm % 2 == 0: # The opponent gets mated
+            external_wins.setdefault(child_dtm + 1, []).append(parent)
+        else:
+            external_losses.setdefault(child_dtm, []).append(parent)
+    for parent, child_value in externals:
+        remaining[parent] += 1 # Drawn captures never count down, so their parent can't be lost
+
+    resolved = bytearray(size) # 1 once the distance is known
+    frontier = [i for i in range(size) if values[i] == 1]
+    for i in frontier:
+        resolved[i] = 1
+    for i in range(size):
+        if values[i] == INVALID:
+            resolved[i] = 1
+    distance = 0
+    max_external = max(list(external_wins) + list(external_losses) + [0])
+    while frontier or distance <= max_external:
+        next_frontier = []
+        for parent in external_wins.get(distance + 1, ()):
+            if not resolved[parent]:
+                resolved[parent] = 1
+                values[parent] = distance + 2
+                next_frontier.append(parent)
+        decided_losses = external_losses.get(distance, [])
+        for position in frontier:
+            for parent in predecessors[predecessor_starts[position]:predecessor_starts[position + 1]]:
+                if resolved[parent]:
+                    continue
+                if distance % 2 == 0: # position is lost for the side to move there, so parent wins
+                    resolved[parent] = 1
+                    values[parent] = distance + 2
+                    next_frontier.append(parent)
+                else:
+                    decided_losses.append(parent)
+        for parent in decided_losses:
+            if resolved[parent]:
+                continue
+            remaining[parent] -= 1
+            if remaining[parent] == 0 and distance % 2 == 1: # Every move lets the opponent mate
+                resolved[parent] = 1
+                values[parent] = distance + 2
+                next_frontier.append(parent)
+        frontier = next_frontier
+        distance += 1
+
+    os.makedirs(directory, exist_ok=True)
+    path = _table_path(directory, signature)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(TB_MAGIC + signature.ljust(SIGNATURE_BYTES).encode())
+        file.write(values)
+    os.replace(temp_path, path)
+
+    wins = sum(1 for value in values if value not in (DRAW, INVALID) and (value - 1) % 2 == 1)
+    losses = sum(1 for value in values if value not in (DRAW, INVALID) and (value - 1) % 2 == 0)
+    draws = values.count(DRAW)
+    longest = max((value - 1 for value in values if value != INVALID), default=0)
+    return {"wins": wins, "draws": draws, "losses": losses, "longest_mate": longest}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate endgame tablebases by retrograde analysis.")
+    parser.add_argument("signatures", nargs="*", default=list(DEFAULT_TABLES),
+                        help="Material to generate (3 pieces), strongest side first (default: KQK KRK KPK)")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--directory", default=DATA_DIR)
+    args = parser.parse_args()
+    for signature in args.signatures:
+        white, black = split_signature(signature.upper())
+        signature = _sort_side(white) + _sort_side(black)
+        start = time.perf_counter()
+        stats = generate_table(signature, args.directory, args.processes)
+        print(f"{signature}: {stats['wins']} wins, {stats['draws']} draws, {stats['losses']} losses, "
+              f"longest mate {stats['longest_mate']} plies ({time.perf_counter() - start:.1f}s)")
+
+if __name__ == "__main__":
+    main()
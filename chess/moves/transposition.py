@@ -0,0 +1,124 @@
+"""
+Fixed-size transposition table for the search.
+
+The table is an array of buckets addressed by Zobrist key. Each bucket has
+two entries: a depth-preferred slot, only overwritten by a search at least
+as deep, and an always-replace slot that takes everything else. An entry is
+two 64-bit words, (key ^ data, data); a torn or foreign entry fails the key
+check instead of returning wrong data. Because the table is a flat block of
+words, its size in MB is exact and it can live in a shared memory buffer.
+"""
+
+from typing import NamedTuple
+
+from moves.position import Move
+
+# Bound types
+EXACT = 0
+LOWER = 1 # Score is at least this (the search failed high)
+UPPER = 2 # Score is at most this (the search failed low)
+
+ENTRY_WORDS = 2
+BUCKET_WORDS = 2 * ENTRY_WORDS
+BUCKET_BYTES = BUCKET_WORDS * 8
+
+_PROMOTIONS = (None, "queen", "rook", "bishop", "knight")
+_VALID_BIT = 1 << 63
+_SCORE_OFFSET = 1 << 31
+
+
+class TTEntry(NamedTuple):
+    depth: int
+    score: int
+    flag: int
+    move: Move | None
+
+
+def _pack(depth: int, score: int, flag: int, move: Move | None) -> int:
+    packed_move = 0
+    if move is not None:
+        packed_move = 1 | (move.from_sq << 1) | (move.to_sq << 7) | (_PROMOTIONS.index(move.promotion) << 13)
+    return (_VALID_BIT | min(depth, 255) | (flag << 8) | (packed_move << 10)
+            | ((score + _SCORE_OFFSET) << 26))
+
+def _unpack(data: int) -> TTEntry:
+    packed_move = (data >> 10) & 0xFFFF
+    move = None
+    if packed_move & 1:
+        move = Move((packed_move >> 1) & 63, (packed_move >> 7) & 63, _PROMOTIONS[(packed_move >> 13) & 7])
+    score = ((data >> 26) & 0xFFFFFFFF) - _SCORE_OFFSET
+    return TTEntry(data & 255, score, (data >> 8) & 3, move)
+
+
+class TranspositionTable:
+    def __init__(self, size_mb: float = 16, buffer=None):
+        """
+        size_mb sets the memory used. Pass a writable buffer (e.g. a
+        multiprocessing.shared_memory block's .buf) to place the table in it;
+        its length then decides the size.
+        """
+        if buffer is None:
+            buffer = bytearray(max(1, int(size_mb * 1024 * 1024) // BUCKET_BYTES) * BUCKET_BYTES)
+        self.num_buckets = len(buffer) // BUCKET_BYTES
+        self._bytes = memoryview(buffer)[:self.num_buckets * BUCKET_BYTES]
+        self.words = self._bytes.cast("Q")
+        self.reset_stats()
+
+    @property
+    def size_mb(self) -> float:
+        return self.num_buckets * BUCKET_BYTES / (1024 * 1024)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0 # Misses where the bucket was holding other positions
+        self.stores = 0
+
+    def clear(self):
+        self._bytes[:] = bytes(len(self._bytes))
+        self.reset_stats()
+
+    def probe(self, key: int) -> TTEntry | None:
+        words = self.words
+        base = (key % self.num_buckets) * BUCKET_WORDS
+        for slot in (base, base + ENTRY_WORDS):
+            data = words[slot + 1]
+            if data and words[slot] ^ data == key:
+                self.hits += 1
+                return _unpack(data)
+        self.misses += 1
+        if words[base + 1] or words[base + ENTRY_WORDS + 1]:
+            self.collisions += 1
+        return None
+
+    def store(self, key: int, depth: int, score: int, flag: int, move: Move | None):
+        words = self.words
+        base = (key % self.num_buckets) * BUCKET_WORDS
+        deep_slot, always_slot = base, base + ENTRY_WORDS
+        deep_data = words[deep_slot + 1]
+        if not deep_data or words[deep_slot] ^ deep_data == key or depth >= (deep_data & 255):
+            slot = deep_slot
+        else:
+            slot = always_slot
+        data = _pack(depth, score, flag, move)
+        words[slot] = key ^ data
+        words[slot + 1] = data
+        self.stores += 1
+
+    def usage(self, sample_buckets: int = 1000) -> float:
+        """Fraction of entries in use, estimated from the first buckets."""
+        sample = min(sample_buckets, self.num_buckets)
+        used = sum(1 for slot in range(0, sample * BUCKET_WORDS, ENTRY_WORDS) if self.words[slot + 1])
+        return used / (sample * 2)
+
+    def stats(self) -> dict:
+        probes = self.hits + self.misses
+        return {
+            "size_mb": round(self.size_mb, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "hit_rate": self.hits / probes if probes else 0.0,
+            "usage": self.usage(),
+        }
@@ -0,0 +1,44 @@
+"""
+Zobrist keys for position identity.
+
+A position's key is the XOR of one random 64-bit number per (piece, square),
+plus numbers for the side to move, each castling right and the en-passant
+file. Position updates its key incrementally as pieces move, so two
+positions reached by different move orders get the same key without
+comparing boards. The numbers come from a fixed seed so every process (and
+every file built from keys, such as the opening book) agrees on them.
+"""
+
+import random
+
+ZOBRIST_SEED = 0x5EED_C4E55
+# Same values as moves.position.WHITE/BLACK/PIECE_TYPES (position imports this module)
+COLORS = ("white", "black")
+PIECE_TYPES = ("pawn", "knight", "bishop", "rook", "queen", "king")
+
+_rng = random.Random(ZOBRIST_SEED)
+
+PIECE_KEYS = {(color, piece_type): [_rng.getrandbits(64) for _ in range(64)]
+            for color in COLORS for piece_type in PIECE_TYPES}
+SIDE_KEY = _rng.getrandbits(64) # XORed in when black is to move
+CASTLING_KEYS = {right: _rng.getrandbits(64) for right in "KQkq"}
+EP_FILE_KEYS = [_rng.getrandbits(64) for _ in range(8)]
+
+
+def castling_key(castling_rights: str) -> int:
+    key = 0
+    for right in castling_rights:
+        key ^= CASTLING_KEYS[right]
+    return key
+
+def ep_key(ep_square: int | None) -> int:
+    return 0 if ep_square is None else EP_FILE_KEYS[ep_square % 8]
+
+def compute_key(position) -> int:
+    """Computes a position's key from scratch (Position keeps it up to date incrementally)."""
+    key = 0
+    for piece in position:
+        key ^= PIECE_KEYS[(piece.color, piece.piece_type)][int(piece.row) * 8 + int(piece.col)]
+    if position.side_to_move == "black":
+        key ^= SIDE_KEY
+    return key ^ castling_key(position.castling_rights) ^ ep_key(position.ep_square)
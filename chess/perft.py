@@ -0,0 +1,164 @@
+"""
+Perft: counts the leaf nodes of the legal move tree to a fixed depth.
+
+The counts are compared against published values to catch move generator
+bugs, and the nodes per second show speed regressions. Moves come from
+moves.bitboard, the generator InputHandler and the AI use; --validate also
+checks every node against the per-piece rules in moves.move_logic.
+
+Run from the chess folder:
+    python perft.py --depth 4
+    python perft.py --depth 3 --fen "<FEN>" --divide
+    python perft.py --suite
+"""
+
+import argparse
+import sys
+import time
+
+from moves import bitboard, move_logic
+from moves.fen import parse_fen, FenError, START_FEN
+from moves.position import Position
+
+# (name, FEN, {depth: published node count})
+PERFT_SUITE = [
+    ("start", START_FEN, {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     {1: 48, 2: 2039, 3: 97862, 4: 4085603}),
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    ("position 4 mirrored", "r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1",
+     {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    ("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", {1: 44, 2: 1486, 3: 62379}),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     {1: 46, 2: 2079, 3: 89890}),
+    ("illegal en passant 1", "3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1", {6: 1134888}),
+    ("illegal en passant 2", "8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1", {6: 1015133}),
+    ("en passant gives check", "8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1", {6: 1440467}),
+    ("short castling gives check", "5k2/8/8/8/8/8/8/4K2R w K - 0 1", {6: 661072}),
+    ("long castling gives check", "3k4/8/8/8/8/8/8/R3K3 w Q - 0 1", {6: 803711}),
+    ("castling rights", "r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1", {4: 1274206}),
+    ("castling prevented", "r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1", {4: 1720476}),
+    ("promotions", "n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1", {1: 24, 2: 496, 3: 9483, 4: 182838}),
+    ("promote out of check", "8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1", {5: 1004658}),
+    ("promote to give check", "4k3/1P6/8/8/8/8/K7/8 w - - 0 1", {6: 217342}),
+    ("underpromote to give check", "8/P1k5/K7/8/8/8/8/8 w - - 0 1", {6: 92683}),
+    ("self stalemate", "K1k5/8/P7/8/8/8/8/8 w - - 0 1", {6: 2217}),
+    ("stalemate and checkmate", "8/k1P5/8/1K6/8/8/8/8 w - - 0 1", {7: 567584}),
+    ("double check", "8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1", {4: 23527}),
+]
+
+
+class PerftMismatch(Exception):
+    """Raised by --validate when the generator and move_logic disagree."""
+
+
+def perft(position: Position, depth: int, validate: bool = False) -> int:
+    """Number of leaf nodes depth plies below position. The position is left unchanged."""
+    if depth == 0:
+        return 1
+    moves = bitboard.generate_legal_moves(position)
+    if validate:
+        _validate_moves(position, moves)
+    if depth == 1 and not validate:
+        return len(moves) # Bulk count, no need to play the last ply
+    nodes = 0
+    for move in moves:
+        position.make_move(move)
+        nodes += perft(position, depth - 1, validate)
+        position.unmake_move()
+    return nodes
+
+def divide(position: Position, depth: int, validate: bool = False) -> dict[str, int]:
+    """Perft split by root move: {"e2e4": nodes, ...}."""
+    counts = {}
+    for move in bitboard.generate_legal_moves(position):
+        position.make_move(move)
+        counts[move.uci()] = perft(position, depth - 1, validate)
+        position.unmake_move()
+    return counts
+
+def _validate_moves(position: Position, moves: list):
+    """Compares the generated moves with move_logic's per-piece rules for every square."""
+    generated = {(move.from_sq, move.to_sq) for move in moves}
+    reference = set()
+    for piece in list(position):
+        if piece.color != position.side_to_move:
+            continue
+        for row in range(position.board_size):
+            for col in range(position.board_size):
+                if move_logic.is_move_legal(piece, row, col, position, position.board_size):
+                    reference.add((bitboard.square_index(piece.row, piece.col), bitboard.square_index(row, col)))
+    if generated != reference:
+        names = lambda squares: sorted(move_logic.coords_to_algebraic(*bitboard.square_coords(f))
+                                    + move_logic.coords_to_algebraic(*bitboard.square_coords(t)) for f, t in squares)
+        raise PerftMismatch(f"Only in generator: {names(generated - reference)}, "
+                            f"only in move_logic: {names(reference - generated)}")
+
+
+def run_suite(max_nodes: int | None = None, validate: bool = False) -> tuple[bool, float]:
+    """Runs PERFT_SUITE and prints one line per test. Returns (every count matched, overall nodes/s)."""
+    all_passed = True
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, counts in PERFT_SUITE:
+        for depth, expected in sorted(counts.items()):
+            if max_nodes is not None and expected > max_nodes:
+                print(f"{'SKIP':<5} {name:<28} depth {depth} ({expected} nodes)")
+                continue
+            start = time.perf_counter()
+            nodes = perft(parse_fen(fen), depth, validate)
+            elapsed = time.perf_counter() - start
+            total_nodes += nodes
+            total_time += elapsed
+            passed = nodes == expected
+            all_passed = all_passed and passed
+            print(f"{'ok' if passed else 'FAIL':<5} {name:<28} depth {depth} {nodes:>9} "
+                  f"(expected {expected}) {elapsed:7.2f}s {nodes / max(elapsed, 1e-9):>9.0f} nodes/s")
+    nps = total_nodes / max(total_time, 1e-9)
+    print(f"Total {total_nodes} nodes in {total_time:.2f}s, {nps:.0f} nodes/s")
+    return all_passed, nps
+
+def main():
+    parser = argparse.ArgumentParser(description="Count move tree leaf nodes (perft) to check the move generator.")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fen", default=START_FEN, help="Position to start from (default: initial position)")
+    parser.add_argument("--divide", action="store_true", help="Print the node count below each root move")
+    parser.add_argument("--validate", action="store_true",
+                        help="Check every node against moves.move_logic (much slower)")
+    parser.add_argument("--suite", action="store_true", help="Run the benchmark suite of known counts")
+    parser.add_argument("--max-nodes", type=int, default=None, help="Skip suite tests bigger than this")
+    parser.add_argument("--min-nps", type=float, default=None,
+                        help="Fail if the speed drops below this many nodes per second")
+    args = parser.parse_args()
+
+    if args.suite:
+        passed, nps = run_suite(args.max_nodes, args.validate)
+    else:
+        try:
+            position = parse_fen(args.fen)
+        except FenError as error:
+            parser.error(str(error))
+        start = time.perf_counter()
+        if args.divide:
+            counts = divide(position, args.depth, args.validate)
+            for move, count in sorted(counts.items()):
+                print(f"{move}: {count}")
+            nodes = sum(counts.values())
+            print(f"\nMoves: {len(counts)}")
+        else:
+            nodes = perft(position, args.depth, args.validate)
+        elapsed = time.perf_counter() - start
+        passed = True
+        nps = nodes / max(elapsed, 1e-9)
+        print(f"Nodes: {nodes}")
+        print(f"Time: {elapsed:.3f}s ({nps:.0f} nodes/s)")
+    if not passed:
+        sys.exit(1)
+    if args.min_nps is not None and nps < args.min_nps:
+        print(f"Too slow: below {args.min_nps:.0f} nodes/s")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
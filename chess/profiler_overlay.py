@@ -0,0 +1,61 @@
+import time
+import arcade
+import pyglet
+from components.profiler import Profiler
+
+# Sections shown, in order, with their labels
+OVERLAY_SECTIONS = (("draw", "draw frame"), ("update", "update"), ("possible_moves", "possible moves"),
+                    ("check_for_check", "check for check"), ("choose_move", "AI choose_move"),
+                    ("ai_search", "AI worker search"))
+
+class ProfilerOverlay:
+    """
+    Table of the profiler's timings (last, p50, p95, p99 in ms) drawn over
+    the top left of the board. The text is refreshed a few times a second,
+    not on every frame, so the overlay hardly shows in its own timings.
+    """
+    def __init__(self, profiler: Profiler, x: float, top_y: float, refresh_interval: float = 0.25):
+        self.profiler = profiler
+        self.x = x
+        self.top_y = top_y
+        self.refresh_interval = refresh_interval
+        self.visible = False
+        self.line_height = 16
+        self.width = 390
+        self.height = self.line_height * (len(OVERLAY_SECTIONS) + 1) + 10
+        self.batch = pyglet.graphics.Batch()
+        # One Text per cell, numbers right-aligned in their column (no monospace font needed)
+        self.rows = []
+        for i in range(len(OVERLAY_SECTIONS) + 1):
+            y = top_y - 14 - i * self.line_height
+            label = arcade.Text("", x + 6, y, arcade.color.WHITE, font_size=10, batch=self.batch)
+            cells = [arcade.Text("", x + 200 + 60 * column, y, arcade.color.WHITE, font_size=10,
+                                 anchor_x="right", batch=self.batch) for column in range(4)]
+            self.rows.append((label, cells))
+        self._set_row(0, "ms", ("last", "p50", "p95", "p99"))
+        self._last_refresh = 0.0
+
+    def _set_row(self, index: int, label: str, cells):
+        label_text, cell_texts = self.rows[index]
+        label_text.text = label
+        for cell_text, cell in zip(cell_texts, cells):
+            cell_text.text = cell
+
+    def refresh(self):
+        """Puts the profiler's current numbers in the table."""
+        for index, (section, label) in enumerate(OVERLAY_SECTIONS, 1):
+            stats = self.profiler.stats(section)
+            if stats["count"]:
+                self._set_row(index, label, [f"{stats[key]:.2f}" for key in ("last_ms", "p50_ms", "p95_ms", "p99_ms")])
+            else:
+                self._set_row(index, label, ("-", "", "", ""))
+        self._last_refresh = time.perf_counter()
+
+    def draw(self):
+        if not self.visible:
+            return
+        if time.perf_counter() - self._last_refresh >= self.refresh_interval:
+            self.refresh()
+        arcade.draw_lrbt_rectangle_filled(self.x, self.x + self.width, self.top_y - self.height, self.top_y,
+                                        (0, 0, 0, 210))
+        self.batch.draw()
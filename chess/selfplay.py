@@ -0,0 +1,289 @@
+"""
+Headless self-play: AI-vs-AI games without a window, to compare engine settings.
+
+Two engine configurations (A and B) play a match with the same AIPlayer
+and move rules the game uses, one game per task in a process pool. Colors
+alternate every game, and the first plies of each game are random (seeded
+by the game number) so the games don't all repeat. A game ends on
+checkmate, stalemate, insufficient material, the fifty-move rule, a third
+repetition or the move limit.
+
+The output directory gets results.csv (one line per game), games.pgn and
+moves.csv (time, depth and nodes of every move), plus summary.json with the
+score, the Elo difference of A over B and the throughput. From the chess folder:
+    python selfplay.py --games 40 --engine-a depth=4,time=0.5 --engine-b depth=3,time=0.5 --processes 4
+
+Engine settings are comma-separated key=value pairs: name, mode ("search"
+or "random"), depth, time (seconds per move), tt (MB), book and
+tablebases (1 or 0). Unset values are the game's AI_* constants.
+"""
+
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
+
+import components.constants as c
+from moves import bitboard, pgn, san
+from moves.ai_player import AIPlayer
+from moves.book import open_default_book
+from moves.fen import parse_fen, START_FEN
+from moves.position import WHITE, BLACK
+from moves.tablebase import Tablebases, is_dead_draw, material_signature
+
+RESULT_SCORES = {"1-0": (1.0, 0.0), "0-1": (0.0, 1.0), "1/2-1/2": (0.5, 0.5)} # (white, black)
+
+
+class EngineConfig(NamedTuple):
+    name: str
+    mode: str = c.AI_MODE
+    max_depth: int = c.AI_MAX_DEPTH
+    time_limit: float = c.AI_TIME_LIMIT
+    tt_size_mb: float = c.AI_TT_SIZE_MB
+    use_book: bool = c.AI_USE_BOOK
+    use_tablebases: bool = c.AI_USE_TABLEBASES
+
+
+_ENGINE_KEYS = {"name": ("name", str), "mode": ("mode", str), "depth": ("max_depth", int),
+                "time": ("time_limit", float), "tt": ("tt_size_mb", float),
+                "book": ("use_book", lambda text: text not in ("0", "false", "no")),
+                "tablebases": ("use_tablebases", lambda text: text not in ("0", "false", "no"))}
+
+def parse_engine(text: str, default_name: str) -> EngineConfig:
+    """EngineConfig from "key=value,..." settings, e.g. "depth=3,time=0.2,book=0"."""
+    settings = {"name": default_name}
+    for item in filter(None, text.split(",")):
+        key, _, value = item.partition("=")
+        if key.strip() not in _ENGINE_KEYS:
+            raise ValueError(f"Unknown engine setting {key!r} (known: {', '.join(_ENGINE_KEYS)})")
+        field, convert = _ENGINE_KEYS[key.strip()]
+        settings[field] = convert(value.strip())
+    return EngineConfig(**settings)
+
+
+class GameTask(NamedTuple):
+    index: int
+    white: EngineConfig
+    black: EngineConfig
+    seed: int
+    random_plies: int
+    max_plies: int
+    start_fen: str
+
+
+class GameRecord(NamedTuple):
+    index: int
+    white: str
+    black: str
+    result: str # "1-0", "0-1" or "1/2-1/2"
+    termination: str
+    sans: list[str]
+    moves: list[dict] # Per-move timing and search stats
+    seconds: float
+
+
+class HeadlessGame:
+    """The parts of MyGame that AIPlayer reads, without a window or sprites."""
+
+    def __init__(self, start_fen: str, tablebases: Tablebases):
+        self.all_piece_objects = parse_fen(start_fen)
+        self.tablebases = tablebases
+        self.move_counter = 0
+
+
+_worker_tablebases: Tablebases | None = None
+
+def _init_worker():
+    global _worker_tablebases
+    _worker_tablebases = Tablebases()
+
+
+def _termination(position, legal_moves, checkers, plies, max_plies) -> tuple[str, str] | None:
+    """(result, reason) if the game is over, else None."""
+    if not legal_moves:
+        if checkers:
+            return ("0-1" if position.side_to_move == WHITE else "1-0"), "checkmate"
+        return "1/2-1/2", "stalemate"
+    if is_dead_draw(material_signature(position)):
+        return "1/2-1/2", "insufficient material"
+    if position.is_fifty_move_draw():
+        return "1/2-1/2", "fifty-move rule"
+    if position.repetition_count() >= 3:
+        return "1/2-1/2", "threefold repetition"
+    if plies >= max_plies:
+        return "1/2-1/2", "move limit"
+    return None
+
+def play_game(task: GameTask) -> GameRecord:
+    """Plays one game between task.white and task.black."""
+    start = time.perf_counter()
+    rng = random.Random(task.seed)
+    random.seed(task.seed) # Book choices and "random" mode use the random module
+    game = HeadlessGame(task.start_fen, _worker_tablebases or Tablebases())
+    position = game.all_piece_objects
+    players = {color: AIPlayer(game, color, config.mode, config.time_limit, config.max_depth, config.tt_size_mb,
+                               use_book=config.use_book, use_tablebases=config.use_tablebases)
+               for color, config in ((WHITE, task.white), (BLACK, task.black))}
+    names = {WHITE: task.white.name, BLACK: task.black.name}
+
+    sans, moves = [], []
+    legal_moves, checkers = bitboard.legal_moves_and_checkers(position)
+    while True:
+        ended = _termination(position, legal_moves, checkers, len(sans), task.max_plies)
+        if ended is not None:
+            break
+        color = position.side_to_move
+        player = players[color]
+        move_start = time.perf_counter()
+        if len(sans) < task.random_plies:
+            move = rng.choice(legal_moves)
+            stats = {"random": True}
+        else:
+            player.last_search_stats = None
+            move = player.choose_position_move(position, legal_moves)
+            stats = player.last_search_stats or {}
+        move_time = time.perf_counter() - move_start
+
+        san_text = san.format_san(position, move, legal_moves)
+        position.make_move(move)
+        game.move_counter += 1
+        legal_moves, checkers = bitboard.legal_moves_and_checkers(position)
+        san_text += san.check_suffix(checkers, legal_moves)
+
+        source = "random" if stats.get("random") else "tablebase" if stats.get("tablebase") \
+            else "book" if stats.get("book") else "search"
+        moves.append({"game": task.index, "ply": len(sans) + 1, "engine": names[color], "color": color,
+                      "uci": move.uci(), "san": san_text, "source": source, "seconds": round(move_time, 6),
+                      "depth": stats.get("depth", ""), "nodes": stats.get("nodes", ""),
+                      "search_seconds": stats.get("elapsed", ""), "score": stats.get("score", "")})
+        sans.append(san_text)
+
+    result, termination = ended
+    return GameRecord(task.index, task.white.name, task.black.name, result, termination, sans, moves,
+                      time.perf_counter() - start)
+
+
+def elo_difference(wins: int, draws: int, losses: int) -> tuple[float, float]:
+    """
+    Elo difference implied by a score of wins / draws / losses, and its 95%
+    error margin (from the spread of the per-game scores). Infinite when
+    one side scored every point.
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, math.inf
+    score = (wins + draws / 2) / games
+    if score in (0, 1):
+        return (math.inf if score else -math.inf), math.inf
+
+    def elo(fraction: float) -> float:
+        fraction = min(max(fraction, 1e-6), 1 - 1e-6)
+        return 400 * math.log10(fraction / (1 - fraction))
+
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+    return elo(score), (elo(score + margin) - elo(score - margin)) / 2
+
+def run_match(engine_a: EngineConfig, engine_b: EngineConfig, games: int, out_dir: str, processes: int | None = None,
+              random_plies: int = 4, max_plies: int = 300, seed: int = 0, start_fen: str = START_FEN) -> dict:
+    """Plays the match and writes the results to out_dir. Returns the summary."""
+    if engine_a.use_book or engine_b.use_book:
+        book = open_default_book() # Compile data/book.bin once, before the workers open it
+        if book is not None:
+            book.close()
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = [GameTask(index, *((engine_a, engine_b) if index % 2 == 0 else (engine_b, engine_a)),
+                      seed + index, random_plies, max_plies, start_fen) for index in range(games)]
+    points = {engine_a.name: 0.0, engine_b.name: 0.0}
+    wins = draws = losses = 0 # From A's point of view
+    search_nodes = 0
+    search_seconds = 0.0
+    terminations: dict[str, int] = {}
+
+    start = time.perf_counter()
+    with open(os.path.join(out_dir, "results.csv"), "w", newline="") as results_file, \
+            open(os.path.join(out_dir, "moves.csv"), "w", newline="") as moves_file, \
+            open(os.path.join(out_dir, "games.pgn"), "w") as pgn_file:
+        results = csv.writer(results_file)
+        results.writerow(["game", "white", "black", "result", "termination", "plies", "seconds"])
+        moves = csv.DictWriter(moves_file, ["game", "ply", "engine", "color", "uci", "san", "source", "seconds",
+                                            "depth", "nodes", "search_seconds", "score"])
+        moves.writeheader()
+
+        # "spawn" like moves/ai_worker.py, so workers start clean on every platform
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=_init_worker) as pool:
+            futures = [pool.submit(play_game, task) for task in tasks]
+            for finished, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                results.writerow([record.index, record.white, record.black, record.result, record.termination,
+                                  len(record.sans), f"{record.seconds:.3f}"])
+                moves.writerows(record.moves)
+                pgn_file.write(pgn.format_game(record.sans, record.result, {
+                    "Event": "Self-play", "Site": "selfplay.py", "Round": str(record.index + 1),
+                    "White": record.white, "Black": record.black, "Termination": record.termination}, start_fen))
+
+                white_score, black_score = RESULT_SCORES[record.result]
+                points[record.white] += white_score
+                points[record.black] += black_score
+                a_score = white_score if record.white == engine_a.name else black_score
+                wins += a_score == 1.0
+                draws += a_score == 0.5
+                losses += a_score == 0.0
+                terminations[record.termination] = terminations.get(record.termination, 0) + 1
+                for move in record.moves:
+                    if move["source"] == "search":
+                        search_nodes += move["nodes"]
+                        search_seconds += move["search_seconds"]
+                print(f"Game {record.index + 1}/{games} ({finished} done): {record.white} - {record.black} "
+                      f"{record.result} ({record.termination}, {len(record.sans)} plies, {record.seconds:.1f}s)")
+    elapsed = time.perf_counter() - start
+
+    elo, margin = elo_difference(wins, draws, losses)
+    summary = {"engine_a": engine_a._asdict(), "engine_b": engine_b._asdict(), "games": games,
+               "wins": wins, "draws": draws, "losses": losses, "points": points,
+               "elo": elo, "elo_margin": margin, "terminations": terminations, "seconds": elapsed,
+               "games_per_minute": games / elapsed * 60,
+               "nodes_per_second": search_nodes / search_seconds if search_seconds else 0.0}
+    with open(os.path.join(out_dir, "summary.json"), "w") as file:
+        # JSON has no infinity: a one-sided score is written as null
+        json.dump({name: value if not isinstance(value, float) or math.isfinite(value) else None
+                   for name, value in summary.items()}, file, indent=2)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Play AI-vs-AI games without a window and compare two engine settings.")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--engine-a", default="", help='Settings of engine A, e.g. "depth=4,time=0.5"')
+    parser.add_argument("--engine-b", default="", help="Settings of engine B")
+    parser.add_argument("--processes", type=int, default=None, help="Games played at once (default: one per CPU)")
+    parser.add_argument("--random-plies", type=int, default=4, help="Random opening plies, so the games differ")
+    parser.add_argument("--max-plies", type=int, default=300, help="Games this long are drawn")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fen", default=START_FEN, help="Start position of every game")
+    parser.add_argument("--out", default="selfplay_results", help="Output directory")
+    args = parser.parse_args()
+    try:
+        engine_a = parse_engine(args.engine_a, "A")
+        engine_b = parse_engine(args.engine_b, "B")
+    except ValueError as error:
+        parser.error(str(error))
+    if engine_a.name == engine_b.name:
+        parser.error("The engines need different names")
+
+    summary = run_match(engine_a, engine_b, args.games, args.out, args.processes, args.random_plies,
+                        args.max_plies, args.seed, args.fen)
+    print(f"{engine_a.name} vs {engine_b.name}: +{summary['wins']} ={summary['draws']} -{summary['losses']} "
+          f"({summary['points'][engine_a.name]:.1f}-{summary['points'][engine_b.name]:.1f})")
+    print(f"Elo difference: {summary['elo']:+.0f} +/- {summary['elo_margin']:.0f}")
+    print(f"{summary['games_per_minute']:.1f} games/minute, {summary['nodes_per_second']:.0f} nodes/s")
+    print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
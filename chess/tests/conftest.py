@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The game's modules import each other from the chess folder (from moves import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,30 @@
+import pytest
+
+from moves import bitboard
+from moves.encoding import pack_position, unpack_position, PACKED_SIZE
+from moves.fen import parse_fen, to_fen
+from perft import PERFT_SUITE
+
+FENS = [fen for _, fen, _ in PERFT_SUITE]
+
+
+@pytest.mark.parametrize("fen", FENS)
+def test_round_trip(fen):
+    position = parse_fen(fen)
+    data = pack_position(position)
+    assert len(data) == PACKED_SIZE
+    unpacked = unpack_position(data)
+    assert to_fen(unpacked) == fen
+    assert unpacked.key == position.key
+
+@pytest.mark.parametrize("fen", FENS)
+def test_round_trip_after_each_move(fen):
+    position = parse_fen(fen)
+    for move in bitboard.generate_legal_moves(position):
+        position.make_move(move)
+        assert to_fen(unpack_position(pack_position(position))) == to_fen(position)
+        position.unmake_move()
+
+def test_wrong_size_is_rejected():
+    with pytest.raises(ValueError):
+        unpack_position(bytes(PACKED_SIZE - 1))
@@ -0,0 +1,48 @@
+import pytest
+
+from moves import bitboard
+from moves.fen import parse_fen, to_fen, FenError, START_FEN
+from moves.position import starting_position
+from perft import PERFT_SUITE
+
+FENS = [fen for _, fen, _ in PERFT_SUITE]
+
+
+def test_start_fen_is_the_starting_position():
+    assert to_fen(starting_position()) == START_FEN
+    assert parse_fen(START_FEN).key == starting_position().key
+
+@pytest.mark.parametrize("fen", FENS)
+def test_round_trip(fen):
+    assert to_fen(parse_fen(fen)) == fen
+
+@pytest.mark.parametrize("fen", FENS)
+def test_round_trip_after_each_move(fen):
+    position = parse_fen(fen)
+    for move in bitboard.generate_legal_moves(position):
+        position.make_move(move)
+        again = parse_fen(to_fen(position))
+        assert to_fen(again) == to_fen(position)
+        assert again.key == position.key
+        position.unmake_move()
+
+def test_missing_clocks_default():
+    position = parse_fen("4k3/8/8/8/8/8/8/4K3 w - -")
+    assert (position.halfmove_clock, position.fullmove_number) == (0, 1)
+
+@pytest.mark.parametrize("fen", [
+    "4k3/8/8/8/8/8/8/4K3 w Z - 0 1", # Unknown castling right
+    "4k3/8/8/8/8/8/8/4K3 w KK - 0 1", # Repeated right
+    "r3k2r/8/8/8/8/8/8/R3K2R w kqKQ - 0 1", # Rights out of order
+    "4k3/8/8/8/8/8/8/4K3 w - z9 0 1", # Not a square
+    "4k3/8/8/8/8/8/8/4K3 w - e4 0 1", # Not an en-passant rank
+    "4k3/8/8/8/8/8/8/4K3 w - - x 1", # Bad clock
+    "4k3/8/8/8/8/8/8/4K3 x - - 0 1", # Bad side to move
+    "4k3/8/8/8/8/8/8 w - - 0 1", # 7 ranks
+    "4k4/8/8/8/8/8/8/4K3 w - - 0 1", # 9 squares in a rank
+    "4k3/8/8/8/8/8/8/4X3 w - - 0 1", # Unknown piece
+    "4k3/8/8/8/8/8/8/4K3 w -", # Missing field
+])
+def test_malformed_fen_raises_fen_error(fen):
+    with pytest.raises(FenError):
+        parse_fen(fen)
@@ -0,0 +1,26 @@
+import pytest
+
+from moves.fen import parse_fen
+from perft import PERFT_SUITE, perft, divide
+
+MAX_NODES = 10000 # Keeps the suite to a few seconds
+
+CASES = [(name, fen, depth, expected) for name, fen, counts in PERFT_SUITE
+         for depth, expected in sorted(counts.items()) if expected <= MAX_NODES]
+
+
+@pytest.mark.parametrize("name, fen, depth, expected", CASES, ids=[f"{case[0]}-{case[2]}" for case in CASES])
+def test_perft_suite(name, fen, depth, expected):
+    assert perft(parse_fen(fen), depth) == expected
+
+def test_perft_leaves_the_position_unchanged():
+    position = parse_fen(PERFT_SUITE[1][1])
+    key = position.key
+    perft(position, 2)
+    assert position.key == key
+
+def test_divide_adds_up_to_perft():
+    position = parse_fen(PERFT_SUITE[0][1])
+    counts = divide(position, 2)
+    assert len(counts) == 20
+    assert sum(counts.values()) == 400
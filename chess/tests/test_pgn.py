@@ -0,0 +1,48 @@
+from moves import bitboard
+from moves.fen import parse_fen, to_fen, START_FEN
+from moves.pgn import format_game, iter_games, replay, validate_file
+from moves.san import format_san, check_suffix
+
+
+def play_game(start_fen: str, plies: int) -> tuple[list[str], str]:
+    """SANs of a game where each side plays its last legal move, and the final FEN."""
+    position = parse_fen(start_fen)
+    legal_moves = bitboard.generate_legal_moves(position)
+    sans = []
+    for _ in range(plies):
+        if not legal_moves:
+            break
+        move = legal_moves[-1]
+        san = format_san(position, move, legal_moves)
+        position.make_move(move)
+        legal_moves, checkers = bitboard.legal_moves_and_checkers(position)
+        sans.append(san + check_suffix(checkers, legal_moves))
+    return sans, to_fen(position)
+
+def test_write_then_replay():
+    sans, final_fen = play_game(START_FEN, 60)
+    text = format_game(sans, "*", {"White": "A", "Black": "B"})
+    games = list(iter_games(text.splitlines(keepends=True)))
+    assert len(games) == 1
+    assert games[0].sans == sans
+    assert games[0].tags["White"] == "A"
+    assert to_fen(replay(games[0], validate=True)) == final_fen
+
+def test_write_then_replay_from_fen():
+    start_fen = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R b KQkq - 0 1"
+    sans, final_fen = play_game(start_fen, 20)
+    text = format_game(sans, "1/2-1/2", start_fen=start_fen)
+    game, = iter_games(text.splitlines(keepends=True))
+    assert game.start_fen() == start_fen
+    assert game.result == "1/2-1/2"
+    assert to_fen(replay(game)) == final_fen
+
+def test_bad_fen_tag_counts_as_a_bad_game(tmp_path):
+    path = tmp_path / "games.pgn"
+    path.write_text('[Event "bad"]\n[SetUp "1"]\n[FEN "4k3/8/8/8/8/8/8/4K3 w Z - 0 1"]\n\n1. Kd2 *\n\n'
+                    '[Event "good"]\n\n1. e4 e5 2. Nf3 *\n', encoding="utf-8")
+    stats = validate_file(str(path), validate=True)
+    assert stats["games"] == 2
+    assert stats["bad_games"] == 1
+    assert stats["plies"] == 3
+    assert stats["errors"][0].startswith("game at line 1: bad FEN tag")
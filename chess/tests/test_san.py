@@ -0,0 +1,34 @@
+import pytest
+
+from moves import bitboard
+from moves.fen import parse_fen, START_FEN
+from moves.san import format_san, parse_san, SanError
+from perft import PERFT_SUITE
+
+FENS = [fen for _, fen, _ in PERFT_SUITE]
+
+
+@pytest.mark.parametrize("fen", FENS)
+def test_format_then_parse_gives_the_move(fen):
+    position = parse_fen(fen)
+    legal_moves = bitboard.generate_legal_moves(position)
+    sans = set()
+    for move in legal_moves:
+        san = format_san(position, move, legal_moves)
+        assert parse_san(position, san, legal_moves) == move
+        sans.add(san)
+    assert len(sans) == len(legal_moves) # Disambiguation keeps every move distinct
+
+def test_castling_and_promotion():
+    position = parse_fen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    sans = {format_san(position, move) for move in bitboard.generate_legal_moves(position)}
+    assert {"O-O", "O-O-O"} <= sans
+    position = parse_fen("n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1")
+    sans = {format_san(position, move) for move in bitboard.generate_legal_moves(position)}
+    assert {"g1=R", "gxf1=Q", "gxh1=N"} <= sans
+    assert "f1=Q" not in sans # Blocked by the knight
+    assert parse_san(position, "gxf1=N").promotion == "knight"
+
+def test_illegal_move_is_rejected():
+    with pytest.raises(SanError):
+        parse_san(parse_fen(START_FEN), "e5")